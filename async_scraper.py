@@ -0,0 +1,280 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from http_client import HEADERS, MAX_RETRIES, RETRY_STATUSES, canonical_url, get_cache, retry_delay
+from metrics import (COALESCED_FETCHES, FETCH_SECONDS, FETCHES_IN_FLIGHT, HTTP_CACHE, HTTP_RESPONSES, HTTP_RETRIES,
+                     PARSE_FAILURES, PARSE_SECONDS)
+from salary_parser import parse_salary_page, timed_parse
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for asyncio tasks.
+
+    Tokens are refilled continuously at `rate` tokens per second up to `capacity`.
+    Each request consumes one token; when the bucket is empty the caller sleeps
+    just long enough for the next token to arrive.
+    """
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """Keeps one TokenBucket per host so every host gets its own request budget."""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        return self.buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket_for(url).acquire()
+
+
+def salary_page_url(job_url: str, job_city: str) -> str:
+    """The canonical URL of a job title's salary page for a city; units with equal URLs are the same page."""
+    return canonical_url(f"{job_url}/{job_city}")
+
+
+async def fetch_html_async(session: aiohttp.ClientSession, url: str, limiter: HostRateLimiter,
+                           max_retries: int = MAX_RETRIES) -> bytes:
+    """
+    Fetch the raw HTML bytes of a given URL once the host's rate limiter allows it.
+
+    Responses with a 429/5xx status and connection errors are retried with the
+    same backoff policy as the shared `http_client` session, honouring `Retry-After`.
+    The `http_client` response cache, when enabled, is consulted first.
+    """
+    with FETCH_SECONDS.time(client="async"), FETCHES_IN_FLIGHT.track_inprogress(client="async"):
+        cache = get_cache()
+        entry = cache.get(url) if cache else None
+        if entry and cache.is_fresh(entry):
+            HTTP_CACHE.inc(result="hit")
+            return entry.body
+        headers = entry.conditional_headers() if entry else None
+
+        for attempt in range(1, max_retries + 2):
+            await limiter.acquire(url)
+            try:
+                async with session.get(url, headers=headers) as response:
+                    HTTP_RESPONSES.inc(client="async", status=response.status)
+                    if entry and response.status == 304:
+                        HTTP_CACHE.inc(result="revalidated")
+                        cache.revalidated(url)
+                        return entry.body
+                    if response.status in RETRY_STATUSES and attempt <= max_retries:
+                        HTTP_RETRIES.inc(client="async")
+                        await asyncio.sleep(retry_delay(attempt, response.headers.get("Retry-After")))
+                        continue
+                    if cache:
+                        HTTP_CACHE.inc(result="miss")
+                    response.raise_for_status()
+                    body = await response.read()
+                    if cache:
+                        cache.store(url, response.status, response.headers, body, response.get_encoding())
+                    return body
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt > max_retries:
+                    raise
+                HTTP_RETRIES.inc(client="async")
+                await asyncio.sleep(retry_delay(attempt))
+
+
+async def fetch_salary_page_async(session: aiohttp.ClientSession, limiter: HostRateLimiter, job_title: str,
+                                  job_city: str, job_url: str) -> bytes | None:
+    """
+    Fetch the raw salary page of a job title/city pair.
+
+    Args:
+        session (aiohttp.ClientSession): The shared HTTP session.
+        limiter (HostRateLimiter): Rate limiter applied before every request.
+        job_title (str): The job title to search for (e.g., "senior developer").
+        job_city (str): The city to search in (e.g., "new york").
+        job_url (str): The salary page URL resolved for the job title.
+
+    Returns:
+        bytes: The raw page, or None if it cannot be fetched.
+    """
+    if not job_title or not job_city:
+        print("Error: Both job_title and job_city are required.")
+        return None
+
+    url = salary_page_url(job_url, job_city)
+
+    try:
+        return await fetch_html_async(session, url, limiter)
+
+    except aiohttp.ClientError as e:
+        print(f"HTTP request failed: {e}")
+    except asyncio.TimeoutError:
+        print(f"HTTP request timed out: {url}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    return None
+
+
+async def extract_salary_info_async(session: aiohttp.ClientSession, limiter: HostRateLimiter, job_title: str,
+                                    job_city: str, job_url: str) -> tuple | None:
+    """Async counterpart of `main.extract_salary_info()`: fetch a salary page and parse it in the event loop."""
+    page = await fetch_salary_page_async(session, limiter, job_title, job_city, job_url)
+    if not page:
+        return None
+    with PARSE_SECONDS.time():
+        record = parse_salary_page(page)
+    if record is None:
+        PARSE_FAILURES.inc()
+    return record
+
+
+async def crawl(job_links: dict, cities: list, concurrency: int = 10, rate: float = 5.0,
+                timeout: float = 30, parse_workers: int = 0, queue_size: int = None, units: list = None,
+                on_result=None) -> list[tuple]:
+    """
+    Fetch the salary page of every job title/city pair concurrently.
+
+    With `parse_workers` set, fetching and parsing become two separately sized
+    stages: fetchers put raw pages on a bounded queue and parser tasks hand them
+    to a process pool, so parsing uses several cores and never stalls the event
+    loop. A fetcher keeps its concurrency slot until the queue accepts its page,
+    so slow parsing throttles fetching instead of piling pages up in memory.
+
+    Units whose job titles resolved to the same salary page are coalesced: the
+    page is fetched and parsed once, and every such unit gets that result.
+
+    Args:
+        job_links (dict): Maps each job title to its resolved salary page URL.
+        cities (list): City slugs to fetch for every job title (e.g., "New-York-NY").
+        concurrency (int): Maximum number of requests in flight at once (default: 10).
+        rate (float): Requests per second allowed for each host (default: 5.0).
+        timeout (float): Total timeout in seconds for a single request (default: 30).
+        parse_workers (int): Parser processes; 0 parses inline in the event loop (default: 0).
+        queue_size (int): Pages allowed to wait for a parser (default: 4 per parser process).
+        units (list): (job_title, city) pairs to fetch instead of every title/city combination.
+        on_result (callable): Called as `on_result(job_title, city, result)` as soon as each pair
+            finishes; `result` is None when the pair failed.
+
+    Returns:
+        list: A list of salary data tuples, in job title/city order.
+    """
+    if units is None:
+        units = [(job, city) for job in job_links for city in cities]
+    if on_result:
+        for job, city in units:
+            if not job_links.get(job):
+                on_result(job, city, None)
+    units = [(job, job_links[job], city) for job, city in units if job_links.get(job)]
+    results = [None] * len(units)
+    limiter = HostRateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    pages = {}  # canonical page URL -> future of its parsed result
+    done = 0
+
+    def progress(index):
+        nonlocal done
+        if on_result:
+            job, _, city = units[index]
+            on_result(job, city, results[index])
+        done += 1
+        if done % 50 == 0 or done == len(units):
+            print(f"Processed {done}/{len(units)} pages...")
+
+    def claim(link, city):
+        """Return a future to resolve for the unit's page, or None if another unit already fetches it."""
+        url = salary_page_url(link, city)
+        if url in pages:
+            return None
+        pages[url] = asyncio.get_running_loop().create_future()
+        return pages[url]
+
+    async def follow(index, link, city):
+        COALESCED_FETCHES.inc()
+        results[index] = await pages[salary_page_url(link, city)]
+        progress(index)
+
+    async def worker(session, index, job, link, city):
+        future = claim(link, city)
+        if future is None:
+            return await follow(index, link, city)
+        try:
+            async with semaphore:
+                results[index] = await extract_salary_info_async(session, limiter, job, city, link)
+        finally:
+            future.set_result(results[index])
+        progress(index)
+
+    async def fetcher(session, queue, index, job, link, city):
+        future = claim(link, city)
+        if future is None:
+            return await follow(index, link, city)
+        async with semaphore:
+            page = await fetch_salary_page_async(session, limiter, job, city, link)
+            if page:
+                await queue.put((index, page, future))
+            else:
+                future.set_result(None)
+                progress(index)
+
+    async def parser(queue, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, page, future = item
+            try:
+                results[index], seconds = await loop.run_in_executor(executor, timed_parse, page)
+                PARSE_SECONDS.observe(seconds)
+            except Exception as e:
+                print(f"Parser worker failed: {e}")
+            if results[index] is None:
+                PARSE_FAILURES.inc()
+            future.set_result(results[index])
+            progress(index)
+
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=client_timeout) as session:
+        if not parse_workers:
+            await asyncio.gather(*(worker(session, i, *unit) for i, unit in enumerate(units)))
+        else:
+            queue = asyncio.Queue(maxsize=queue_size or parse_workers * 4)
+            # A task group, so a parser failing (e.g. `on_result` could not store results) cancels the
+            # fetchers instead of leaving them blocked on a full queue
+            with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+                async with asyncio.TaskGroup() as group:
+                    parsers = [group.create_task(parser(queue, executor)) for _ in range(parse_workers)]
+                    await asyncio.gather(*(fetcher(session, queue, i, *unit) for i, unit in enumerate(units)))
+                    for _ in parsers:
+                        await queue.put(None)
+
+    return [result for result in results if result]
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from async_scraper import crawl
+from fixture_server import SALARY_PATH, FixtureServer, render_salary_page, slugify
+from main import extract_salary_info, job_titles, read_cities
+from salary_parser import find_occupation_json, find_occupation_json_bs, parse_salary_page
+from salary_record import SalaryRecord
+from store_data import (CsvSink, ExcelSink, JsonArraySink, JsonLinesSink, ParquetSink, SqliteSink,
+                        bulk_ingest, create_normalized_db)
+from work_queue import LEASED, WorkQueue
+
+API_ENDPOINTS = [
+    "/api/jobs/title/Data Scientist",
+    "/api/jobs/city/Chicago",
+    "/api/jobs/salary/Data Scientist/Chicago",
+    "/api/jobs/search?q=data scien chicago",
+    "/api/jobs/salary_range?min=80000&max=90000",
+    "/api/jobs/top_paying/Chicago IL?k=20&percentile=nTile50",
+    "/api/jobs/high_growth",
+    "/api/jobs/paginate?per_page=50&sort=nTile50&order=desc",
+    "/api/stats/cities?limit=20",
+]
+
+
+def throughput(count: int, elapsed: float, unit: str = "pages") -> dict:
+    rate = round(count / elapsed, 1) if elapsed else None
+    return {unit: count, "seconds": round(elapsed, 4), f"{unit}_per_second": rate}
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """Summarize latency samples in seconds as milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def synthetic_records(count: int, cities: list, seed: int = 0):
+    """Yield `count` distinct salary records spread over the job titles and cities."""
+    rng = random.Random(seed)
+    for i in range(count):
+        city = cities[i % len(cities)]
+        title = job_titles[(i // len(cities)) % len(job_titles)]
+        level = i // (len(cities) * len(job_titles))
+        title = f"{title} {level + 1}" if level else title
+        base = rng.uniform(40000, 120000)
+        yield SalaryRecord(title, city.replace("-", " "), f"{title} designs, builds and maintains systems. " * 5,
+                           base, base * 1.15, base * 1.3, base * 1.45, base * 1.6)
+
+
+def bench_sequential(job_links: dict, cities: list) -> tuple[int, float]:
+    start_time = time.perf_counter()
+    results = [extract_salary_info(job, city, link) for job, link in job_links.items() for city in cities]
+    return sum(1 for result in results if result), time.perf_counter() - start_time
+
+
+def bench_async(job_links: dict, cities: list, concurrency: int, rate: float,
+                parse_workers: int = 0) -> tuple[int, float]:
+    start_time = time.perf_counter()
+    results = asyncio.run(crawl(job_links, cities, concurrency=concurrency, rate=rate, parse_workers=parse_workers))
+    return len(results), time.perf_counter() - start_time
+
+
+def bench_extractor(extract, pages: list[bytes], repeat: int) -> float:
+    """Return the mean time in seconds `extract` takes per page."""
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            if extract(page) is None:
+                raise ValueError("extractor could not find the Occupation JSON-LD block")
+    return (time.perf_counter() - start_time) / (repeat * len(pages))
+
+
+def run_crawl(args) -> dict:
+    cities = read_cities('largest_cities.csv')[:args.cities]
+    results = {}
+    with FixtureServer(latency=args.latency, error_rate=args.error_rate, pages_dir=args.pages_dir,
+                       seed=args.seed) as server:
+        job_links = {job: f"{server.base_url}{SALARY_PATH}/{slugify(job)}" for job in job_titles[:args.titles]}
+
+        pages, elapsed = bench_sequential(job_links, cities)
+        results["sequential"] = throughput(pages, elapsed)
+        print(f"sequential: {pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/s)")
+        sequential_rate = pages / elapsed
+
+        pages, elapsed = bench_async(job_links, cities, args.concurrency, args.rate)
+        results["async"] = throughput(pages, elapsed)
+        results["speedup"] = round(pages / elapsed / sequential_rate, 2)
+        print(f"async:      {pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/s)")
+        print(f"speedup:    {pages / elapsed / sequential_rate:.1f}x")
+
+        if args.parse_workers:
+            pages, elapsed = bench_async(job_links, cities, args.concurrency, args.rate, args.parse_workers)
+            results["pipeline"] = throughput(pages, elapsed)
+            print(f"pipeline:   {pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/s, "
+                  f"{args.parse_workers} parser processes)")
+
+        results["server"] = {"requests": server.requests, "errors": server.errors}
+        if server.errors:
+            print(f"server:     {server.requests} requests, {server.errors} answered with 503")
+    return results
+
+
+def run_workers(args) -> dict:
+    """
+    Crawl with several `main.py worker` processes sharing one work queue, SIGKILL one of them while it
+    holds leases, and check that the others still finish every unit.
+    """
+    cities = read_cities('largest_cities.csv')[:args.cities]
+    units = [(job, city) for job in job_titles for city in cities]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with tempfile.TemporaryDirectory() as directory, FixtureServer(latency=args.latency, error_rate=args.error_rate,
+                                                                   seed=args.seed) as server:
+        # Workers read the cities and open the database relative to their working directory
+        with open(os.path.join(directory, "largest_cities.csv"), "w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows([city] for city in cities)
+        db_name, _, _ = create_normalized_db(os.path.join(directory, "salary_results.db"))
+        queue = WorkQueue(db_name, "benchmark", lease_seconds=args.lease_seconds)
+        queue.fill(units, fresh=True)
+
+        command = [sys.executable, script, "worker", "--no-cache", "--base-url", server.base_url, "--delay", "0",
+                   "--batch-size", str(args.batch_size), "--lease-seconds", str(args.lease_seconds)]
+        start_time = time.perf_counter()
+        workers = [subprocess.Popen(command + ["--worker-id", f"worker-{i}"], cwd=directory,
+                                    stdout=subprocess.DEVNULL) for i in range(args.workers)]
+        try:
+            killed = 0
+            while not killed and workers[0].poll() is None:
+                killed = queue.conn.execute('SELECT COUNT(*) FROM work_queue WHERE worker = ? AND status = ?',
+                                            ("worker-0", LEASED)).fetchone()[0]
+                time.sleep(0.01)
+            if not killed:
+                raise ValueError("worker-0 exited before it leased any unit")
+            workers[0].kill()
+            for process in workers:
+                process.wait(timeout=args.timeout)
+        finally:
+            for process in workers:
+                if process.poll() is None:
+                    process.kill()
+        elapsed = time.perf_counter() - start_time
+        summary = queue.summary()
+        queue.close()
+
+    print(f"workers:    {args.workers} processes, worker-0 killed holding {killed} leases")
+    print(f"queue:      {summary} after {elapsed:.2f}s")
+    if summary != {"done": len(units)}:
+        raise ValueError(f"expected all {len(units)} units done, got {summary}")
+    results = throughput(len(units), elapsed, "units")
+    results["killed_leases"] = killed
+    return results
+
+
+def run_parse(args) -> dict:
+    if args.pages:
+        pages = []
+        for path in sorted(glob.glob(args.pages)):
+            with open(path, 'rb') as file:
+                pages.append(file.read())
+    else:
+        pages = [render_salary_page(slugify(job), "New-York-NY", args.padding).encode('utf-8') for job in job_titles]
+
+    if not pages:
+        print(f"Error: No sample pages match '{args.pages}'.")
+        return {}
+
+    avg_size = sum(len(page) for page in pages) / len(pages)
+    print(f"{len(pages)} sample pages, {avg_size / 1024:.0f} KiB on average")
+
+    soup_time = bench_extractor(find_occupation_json_bs, pages, args.repeat)
+    scan_time = bench_extractor(find_occupation_json, pages, args.repeat)
+    parse_time = bench_extractor(parse_salary_page, pages, args.repeat)
+    print(f"beautifulsoup:     {soup_time * 1000:.3f} ms/page")
+    print(f"byte scan:         {scan_time * 1000:.3f} ms/page")
+    print(f"parse_salary_page: {parse_time * 1000:.3f} ms/page")
+    print(f"speedup:           {soup_time / scan_time:.0f}x")
+    return {
+        "pages": len(pages),
+        "average_page_bytes": round(avg_size),
+        "beautifulsoup_ms_per_page": round(soup_time * 1000, 4),
+        "byte_scan_ms_per_page": round(scan_time * 1000, 4),
+        "parse_salary_page_ms_per_page": round(parse_time * 1000, 4),
+        "speedup": round(soup_time / scan_time, 1),
+    }
+
+
+def run_sinks(args) -> dict:
+    cities = read_cities('largest_cities.csv')
+    records = list(synthetic_records(args.rows, cities, args.seed))
+    headers = ['Title', 'Location', 'Description', 'nTile10', 'nTile25', 'nTile50', 'nTile75', 'nTile90']
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name, table_name, columns = create_normalized_db(os.path.join(directory, "bench.db"))
+        sinks = {
+            "csv": CsvSink(os.path.join(directory, "out"), headers),
+            "json": JsonArraySink(os.path.join(directory, "out"), headers),
+            "jsonl": JsonLinesSink(os.path.join(directory, "out"), headers),
+            "excel": ExcelSink(os.path.join(directory, "out"), headers),
+            "parquet": ParquetSink(os.path.join(directory, "out"), headers),
+            "sqlite": SqliteSink(db_name, table_name, columns),
+        }
+        for name, sink in sinks.items():
+            start_time = time.perf_counter()
+            with sink:
+                for record in records:
+                    sink.write(record)
+            results[name] = throughput(len(records), time.perf_counter() - start_time, "rows")
+            results[name]["bytes"] = os.path.getsize(sink.file_path)
+            print(f"{name:<12} {results[name]['rows_per_second']:>12,.0f} rows/s  {results[name]['bytes']:>12,} bytes")
+
+        start_time = time.perf_counter()
+        bulk_ingest(db_name, records, scrape_date="2000-01-01")
+        results["bulk_ingest"] = throughput(len(records), time.perf_counter() - start_time, "rows")
+        print(f"{'bulk_ingest':<12} {results['bulk_ingest']['rows_per_second']:>12,.0f} rows/s")
+    return results
+
+
+def run_api(args) -> dict:
+    import flask_api
+    from db_pool import ConnectionPool
+    from response_cache import MemoryBackend
+    from rollups import refresh_rollups
+
+    cities = read_cities('largest_cities.csv')
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name, _, _ = create_normalized_db(os.path.join(directory, "bench.db"))
+        bulk_ingest(db_name, synthetic_records(args.rows, cities, args.seed))
+        refresh_rollups(db_name)
+        flask_api.pool = ConnectionPool(db_name)
+        client = flask_api.app.test_client()
+
+        for cached in (False, True):
+            # A backend holding no entries makes every request a cache miss
+            flask_api.cache.backend = MemoryBackend() if cached else MemoryBackend(max_entries=0)
+            for endpoint in API_ENDPOINTS:
+                client.get(endpoint)
+                samples = []
+                for _ in range(args.requests):
+                    start_time = time.perf_counter()
+                    response = client.get(endpoint)
+                    response.get_data()
+                    samples.append(time.perf_counter() - start_time)
+                    if response.status_code != 200:
+                        raise ValueError(f"{endpoint} answered {response.status_code}")
+                summary = latency_summary(samples)
+                results.setdefault(endpoint, {})["cached" if cached else "uncached"] = summary
+                print(f"{'cached' if cached else 'uncached':<9} {endpoint:<58} p50 {summary['p50_ms']:>8.3f} ms  "
+                      f"p95 {summary['p95_ms']:>8.3f} ms")
+        flask_api.pool.reset()
+    return results
+
+
+def flatten(results, prefix: str = "") -> dict:
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            values[f"{prefix}{key}"] = value
+    return values
+
+
+def run_compare(args):
+    """Print every metric of two result files side by side with its relative change."""
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = flatten(json.load(file)["results"])
+    with open(args.current, encoding="utf-8") as file:
+        current = flatten(json.load(file)["results"])
+
+    for key in sorted(baseline.keys() | current.keys()):
+        old, new = baseline.get(key), current.get(key)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+        print(f"{key:<70} {old if old is not None else '-':>14} {new if new is not None else '-':>14} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks for the scraper.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="compare sequential and async crawl throughput")
+    crawl_parser.add_argument("--titles", type=int, default=4, help="number of job titles to crawl")
+    crawl_parser.add_argument("--cities", type=int, default=25, help="number of cities per job title")
+    crawl_parser.add_argument("--latency", type=float, default=0.05, help="simulated server latency in seconds")
+    crawl_parser.add_argument("--error-rate", type=float, default=0.0,
+                              help="fraction of requests the fixture server answers with 503")
+    crawl_parser.add_argument("--pages-dir", help="directory of recorded pages to replay instead of generated ones")
+    crawl_parser.add_argument("--concurrency", type=int, default=20)
+    crawl_parser.add_argument("--rate", type=float, default=1000.0, help="requests per second for the async crawl")
+    crawl_parser.add_argument("--parse-workers", type=int, default=0,
+                              help="also run the async crawl with this many parser processes")
+    crawl_parser.set_defaults(func=run_crawl)
+
+    workers_parser = subparsers.add_parser(
+        "workers", help="crawl with several worker processes, kill one, and check every unit still completes")
+    workers_parser.add_argument("--workers", type=int, default=3, help="number of worker processes")
+    workers_parser.add_argument("--cities", type=int, default=10, help="number of cities per job title")
+    workers_parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    workers_parser.add_argument("--error-rate", type=float, default=0.0,
+                                help="fraction of requests the fixture server answers with 503")
+    workers_parser.add_argument("--batch-size", type=int, default=5, help="units leased at a time")
+    workers_parser.add_argument("--lease-seconds", type=float, default=3.0,
+                                help="lease length, i.e. how long the killed worker's units stay blocked")
+    workers_parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for the workers")
+    workers_parser.set_defaults(func=run_workers)
+
+    parse_parser = subparsers.add_parser("parse", help="compare JSON-LD extraction with and without BeautifulSoup")
+    parse_parser.add_argument("--pages", help="glob of saved salary pages (default: generated fixture pages)")
+    parse_parser.add_argument("--padding", type=int, default=1000, help="markup blocks per generated page")
+    parse_parser.add_argument("--repeat", type=int, default=5, help="passes over the sample pages")
+    parse_parser.set_defaults(func=run_parse)
+
+    sinks_parser = subparsers.add_parser("sinks", help="measure the throughput of every output writer")
+    sinks_parser.add_argument("--rows", type=int, default=20000, help="number of salary rows to write")
+    sinks_parser.set_defaults(func=run_sinks)
+
+    api_parser = subparsers.add_parser("api", help="measure Flask endpoint latency, with and without the cache")
+    api_parser.add_argument("--rows", type=int, default=20000, help="number of salary rows in the database")
+    api_parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    api_parser.set_defaults(func=run_api)
+
+    for subparser in (crawl_parser, workers_parser, parse_parser, sinks_parser, api_parser):
+        subparser.add_argument("--seed", type=int, default=0, help="seed for generated data and errors")
+        subparser.add_argument("--json", metavar="PATH", help="also write the results to this JSON file")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two JSON result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.set_defaults(func=run_compare)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        args.func(args)
+        return
+
+    results = args.func(args)
+    if args.json:
+        parameters = {key: value for key, value in vars(args).items() if key not in ("func", "command", "json")}
+        report = {
+            "benchmark": args.command,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+        print(f"Results written to '{args.json}'.")
+
+
+if __name__ == '__main__':
+    main()
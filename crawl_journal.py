@@ -0,0 +1,207 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from metrics import WRITE_SECONDS, WRITTEN_ROWS
+from store_data import (bump_data_version, coerce_record, insert_normalized_record, is_normalized_db,
+                        location_ids, refresh_top_paying)
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+FLUSH_ATTEMPTS = 3
+FLUSH_RETRY_DELAY = 1.0
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class CrawlJournal:
+    """
+    Records the outcome of every (job title, city) unit of a crawl in SQLite.
+
+    The journal lives in the same database as the salary table, so a finished
+    unit and its salary row are committed in the same transaction. A crawl that
+    is restarted skips units marked done and retries failed ones until they have
+    been attempted `max_attempts` times. Once every unit is settled, the next
+    `start()` begins a new crawl.
+    """
+
+    def __init__(self, db_name: str = "salary_results.db", table_name: str = "crawl_journal", max_attempts: int = 3):
+        self.db_name = db_name
+        self.table_name = table_name
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_name)
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}" (
+                                job_title TEXT NOT NULL,
+                                city TEXT NOT NULL,
+                                status TEXT NOT NULL,
+                                attempt INTEGER NOT NULL DEFAULT 0,
+                                salary_id INTEGER,
+                                error TEXT,
+                                updated_at TEXT NOT NULL,
+                                PRIMARY KEY (job_title, city)
+                                )''')
+        self.conn.commit()
+
+    def start(self, units: list[tuple], fresh: bool = False) -> list[tuple]:
+        """
+        Register the units of a crawl and return the ones that still need work.
+
+        Args:
+            units (list): (job_title, city) pairs making up the whole crawl.
+            fresh (bool): Discard the previous crawl's progress even if it is unfinished.
+
+        Returns:
+            list: The (job_title, city) pairs that are not done yet, in crawl order.
+        """
+        if fresh or not self._has_unsettled_units():
+            self.conn.execute(f'DELETE FROM "{self.table_name}"')
+
+        self.conn.executemany(
+            f'INSERT OR IGNORE INTO "{self.table_name}" (job_title, city, status, updated_at) VALUES (?, ?, ?, ?)',
+            [(job, city, PENDING, utc_now()) for job, city in units]
+        )
+        self.conn.commit()
+
+        settled = set(self.conn.execute(
+            f'SELECT job_title, city FROM "{self.table_name}" WHERE status = ? OR attempt >= ?',
+            (DONE, self.max_attempts)
+        ).fetchall())
+        pending = [unit for unit in units if unit not in settled]
+        if len(pending) < len(units):
+            print(f"Resuming crawl: {len(units) - len(pending)} of {len(units)} units already settled.")
+        return pending
+
+    def _has_unsettled_units(self) -> bool:
+        row = self.conn.execute(
+            f'SELECT 1 FROM "{self.table_name}" WHERE status != ? AND attempt < ? LIMIT 1',
+            (DONE, self.max_attempts)
+        ).fetchone()
+        return row is not None
+
+    def record(self, cursor: sqlite3.Cursor, job_title: str, city: str, salary_id: int | None, error: str = None):
+        """Mark a unit done (with its salary row id) or failed, inside the caller's transaction."""
+        status = DONE if salary_id is not None else FAILED
+        cursor.execute(
+            f'UPDATE "{self.table_name}" SET status = ?, attempt = attempt + 1, salary_id = ?, error = ?, '
+            f'updated_at = ? WHERE job_title = ? AND city = ?',
+            (status, salary_id, error, utc_now(), job_title, city)
+        )
+
+    def settle(self, units: dict):
+        """
+        Mark units done with a salary row they already have, without crawling them.
+
+        Args:
+            units (dict): Maps (job_title, city) pairs to their `salary_facts` id.
+        """
+        with self.conn:
+            self.conn.executemany(
+                f'UPDATE "{self.table_name}" SET status = ?, salary_id = ?, error = NULL, updated_at = ? '
+                f'WHERE job_title = ? AND city = ? AND status != ?',
+                [(DONE, salary_id, utc_now(), job, city, DONE) for (job, city), salary_id in units.items()]
+            )
+
+    def results(self, salary_table: str = "salary") -> sqlite3.Cursor:
+        """
+        Iterate over the salary rows of every unit completed in the current crawl, including earlier runs.
+
+        A row shared by several units, because their job titles resolved to the same page, is listed once.
+        """
+        return self.conn.execute(
+            f'SELECT s.job_title, s.job_location, s.job_description, s.nTile10, s.nTile25, s.nTile50, s.nTile75, '
+            f's.nTile90 FROM "{self.table_name}" j JOIN "{salary_table}" s ON s.id = j.salary_id '
+            f'WHERE j.status = ? GROUP BY s.id ORDER BY MIN(j.rowid)',
+            (DONE,)
+        )
+
+    def summary(self) -> dict:
+        return dict(self.conn.execute(f'SELECT status, COUNT(*) FROM "{self.table_name}" GROUP BY status').fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+class CheckpointWriter:
+    """
+    Buffers crawl results and writes them in small batched transactions.
+
+    Each flush inserts the buffered salary rows and marks their units in the
+    journal within one transaction, so a crash loses at most `batch_size` units
+    of work and never leaves a salary row without its journal entry. Rows go
+    straight into the normalized tables when the database uses them; with a
+    `SalaryHistory`, only estimates that changed since the last crawl are written.
+
+    A flush that fails (e.g. "database is locked") is retried `attempts` times,
+    then the error is raised: the buffered results were not stored, so the
+    crawl must not go on and report them as saved.
+    """
+
+    def __init__(self, journal: CrawlJournal, table_name: str, columns_names: list, batch_size: int = 25,
+                 history=None, attempts: int = FLUSH_ATTEMPTS, retry_delay: float = FLUSH_RETRY_DELAY):
+        self.journal = journal
+        self.table_name = table_name
+        self.columns_names = columns_names
+        self.batch_size = batch_size
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.buffer = []
+        self.written = 0
+        self.normalized = is_normalized_db(journal.conn)
+        self.history = history if self.normalized else None
+
+    def add(self, job_title: str, city: str, result: tuple | None, error: str = None):
+        self.buffer.append((job_title, city, result, error))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered results in one transaction.
+
+        Raises:
+            sqlite3.Error: If the write still fails after `attempts` tries; the results stay in the buffer.
+        """
+        for attempt in range(1, self.attempts + 1):
+            if not self.buffer:
+                return
+            try:
+                self._write()
+                return
+            except sqlite3.Error as e:
+                if self.history:
+                    # Rows remembered during the rolled back transaction were never stored
+                    self.history.payloads.clear()
+                print(f"An error occurred while writing checkpoint (attempt {attempt} of {self.attempts}): {e}")
+                if attempt == self.attempts:
+                    raise
+                time.sleep(self.retry_delay * attempt)
+
+    def _write(self):
+        col_names = ", ".join(self.columns_names)
+        placeholders = ", ".join(["?" for _ in self.columns_names])
+        query = f"INSERT INTO '{self.table_name}' ({col_names}) VALUES ({placeholders})"
+        conn = self.journal.conn
+        written = 0
+        with WRITE_SECONDS.time(writer="checkpoint"), conn:
+            cursor = conn.cursor()
+            for job_title, city, result, error in self.buffer:
+                salary_id, inserted = None, bool(result)
+                if result and self.history:
+                    salary_id, inserted = self.history.record(cursor, job_title, city, result)
+                elif result and self.normalized:
+                    salary_id = insert_normalized_record(cursor, result)
+                elif result:
+                    cursor.execute(query, coerce_record(result))
+                    salary_id = cursor.lastrowid
+                written += inserted
+                self.journal.record(cursor, job_title, city, salary_id, error or (None if result else "no data"))
+            if written:
+                if self.normalized:
+                    refresh_top_paying(cursor, location_ids(
+                        cursor, {coerce_record(item[2])[1] for item in self.buffer if item[2]}))
+                bump_data_version(cursor)
+        # Counts inserted salary rows only: unchanged estimates and repeated payloads write none
+        WRITTEN_ROWS.inc(written, writer="checkpoint")
+        self.written += written
+        self.buffer = []
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KIB = 64 * 1024
+CACHED_STATEMENTS = 256
+
+
+def enable_wal(db_path: str) -> bool:
+    """
+    Switch a database to write-ahead logging.
+
+    The journal mode is stored in the database file, so this only needs to run
+    once; afterwards readers no longer block on the scraper's writes and vice versa.
+    """
+    try:
+        with sqlite3.connect(db_path) as conn:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        return mode.lower() == "wal"
+    except sqlite3.Error as e:
+        print(f"Could not enable WAL mode on '{db_path}': {e}")
+        return False
+
+
+class ConnectionPool:
+    """
+    Per-thread, read-only SQLite connections tuned for serving queries.
+
+    Every thread reuses one connection for its whole life instead of opening a
+    new one per request, which also keeps that connection's prepared-statement
+    cache warm. Connections are opened read-only with `query_only` set, and use
+    memory-mapped I/O plus a large page cache. After a fork (gunicorn workers)
+    connections inherited from the parent are discarded and reopened.
+    """
+
+    def __init__(self, db_path: str, mmap_size: int = MMAP_SIZE, cache_size_kib: int = CACHE_SIZE_KIB,
+                 cached_statements: int = CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self.local = threading.local()
+        self.pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        if os.getpid() != self.pid:
+            self.local = threading.local()
+            self.pid = os.getpid()
+
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self.local.conn = conn
+        return conn
+
+    def reset(self):
+        """Close this thread's connection so the next call reopens it (e.g. after the file was replaced)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
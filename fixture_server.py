@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+SEARCH_PATH = "/research/search"
+SALARY_PATH = "/tools/salary-calculator"
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def render_search_page(keyword: str, results: int = 5) -> str:
+    """Render a search result page listing `results` salary page links for the keyword."""
+    slug = slugify(keyword)
+    links = "\n".join(
+        f'<div class="margin-bottom5 font-semibold"><a href="{SALARY_PATH}/{slug}{"-" + str(i) if i else ""}">'
+        f'{keyword} {i}</a></div>'
+        for i in range(results)
+    )
+    return f"<html><head><title>Search</title></head><body>{links}</body></html>"
+
+
+def render_salary_page(job_slug: str, city: str, padding: int = 200) -> str:
+    """
+    Render a salary page shaped like a Salary.com one.
+
+    The Occupation JSON-LD block sits after `padding` unrelated blocks of markup
+    and scripts, so parsing cost is in the same ballpark as a real page.
+    """
+    title = job_slug.replace("-", " ").title()
+    location = city.replace("-", " ")
+    base = 50000 + (sum(map(ord, job_slug + city)) % 50000)
+    occupation = {
+        "@context": "http://schema.org/",
+        "@type": "Occupation",
+        "name": title,
+        "description": f"{title} designs, builds and maintains systems. " * 10,
+        "occupationLocation": [{"@type": "City", "name": location}],
+        "estimatedSalary": [{
+            "@type": "MonetaryAmountDistribution",
+            "name": "base",
+            "currency": "USD",
+            "duration": "P1Y",
+            "percentile10": float(base),
+            "percentile25": float(base + 7000),
+            "median": float(base + 15000),
+            "percentile75": float(base + 22000),
+            "percentile90": float(base + 30000),
+        }],
+    }
+    breadcrumb = {"@context": "http://schema.org/", "@type": "BreadcrumbList", "itemListElement": []}
+    filler = "\n".join(
+        f'<div class="row"><div class="col-sm-6"><span class="label">Item {i}</span>'
+        f'<a href="/research/item/{i}">Related salary {i}</a></div>'
+        f'<script>window.dataLayer = window.dataLayer || []; dataLayer.push({{"event": "item{i}"}});</script></div>'
+        for i in range(padding)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Salary</title>"
+        f'<script type="application/ld+json">{json.dumps(breadcrumb)}</script>'
+        f"</head><body>{filler}"
+        f'<script type="application/ld+json">{json.dumps(occupation)}</script>'
+        "</body></html>"
+    )
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FixtureServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        time.sleep(fixture.latency)
+        fixture.requests += 1
+
+        if fixture.should_fail():
+            fixture.errors += 1
+            self.send_response(503)
+            self.send_header("Retry-After", str(fixture.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        parts = urlsplit(self.path)
+        if parts.path == SEARCH_PATH:
+            keyword = unquote(parse_qs(parts.query).get("keyword", [""])[0])
+            body = fixture.recorded(f"{SEARCH_PATH}/{slugify(keyword)}") or render_search_page(keyword)
+        elif parts.path.startswith(SALARY_PATH + "/"):
+            segments = parts.path[len(SALARY_PATH) + 1:].split("/")
+            if len(segments) != 2:
+                self.send_error(404)
+                return
+            body = fixture.recorded(parts.path) or render_salary_page(segments[0], segments[1], fixture.padding)
+        else:
+            self.send_error(404)
+            return
+
+        payload = body.encode("utf-8")
+        etag = f'"{hashlib.md5(payload).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            fixture.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FixtureHTTPServer(ThreadingHTTPServer):
+    # socketserver's default backlog of 5 drops connections of concurrent crawls, which then stall for a
+    # full second in TCP's SYN retransmit and skew every timing
+    request_queue_size = 128
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A client that went away mid-response (e.g. a worker killed on purpose) is not a server error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """
+    Local stand-in for salary.com that serves canned search and salary pages.
+
+    Pages recorded from the real site can be replayed from `pages_dir`, laid out
+    like the URLs they came from: `<pages_dir>/research/search/<keyword-slug>.html`
+    and `<pages_dir>/tools/salary-calculator/<job-slug>/<city>.html`. Any page
+    without a recording is generated. A seeded `error_rate` fraction of
+    requests is answered with 503 and a `Retry-After` of `retry_after` seconds.
+
+    Usage:
+        with FixtureServer(latency=0.05, error_rate=0.02) as server:
+            link = f"{server.base_url}/tools/salary-calculator/python-developer"
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, padding: int = 200,
+                 error_rate: float = 0.0, retry_after: int = 0, pages_dir: str = None, seed: int = 0):
+        self.latency = latency
+        self.padding = padding
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.pages_dir = pages_dir
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.httpd = FixtureHTTPServer((host, port), FixtureRequestHandler)
+        self.httpd.fixture = self
+        self.thread = None
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self.random_lock:
+            return self.random.random() < self.error_rate
+
+    def recorded(self, path: str) -> str | None:
+        """Return the recorded page for a URL path, or None if there is none."""
+        if not self.pages_dir:
+            return None
+        root = os.path.realpath(self.pages_dir)
+        file_path = os.path.realpath(os.path.join(root, path.strip("/") + ".html"))
+        if not file_path.startswith(root + os.sep):
+            return None
+        try:
+            with open(file_path, encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == '__main__':
+    with FixtureServer(port=8000) as server:
+        print(f"Serving salary.com fixtures at {server.base_url} (Ctrl+C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
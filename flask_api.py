@@ -1,20 +1,151 @@
 import csv
 import io
+import os
 import sqlite3
 import json
-from flask import Flask, jsonify, request, render_template, Response
+import tempfile
+import textwrap
+import time
+import zlib
+import brotli
+import pyarrow.parquet as pq
+from flask import Flask, g, jsonify, request, render_template, Response, send_file
+
+from db_pool import ConnectionPool, enable_wal
+from fulltext import SEARCH_MODES, has_fts_index, phrase_query, search_jobs
+from metrics import API_REQUEST_SECONDS, API_REQUESTS_IN_FLIGHT, REGISTRY
+from pagination import (SORT_COLUMNS, SORT_ORDERS, InvalidCursor, decode_cursor, encode_cursor, keyset_segments,
+                        order_clause)
+from response_cache import RedisBackend, ResponseCache
+from rollups import ROLLUP_LEVELS, rollup_table
+from salary_snapshot import SalarySnapshot, SnapshotHolder
+from store_data import (TOP_PAYING_DEPTH, arrow_schema, has_top_paying_index, latest_salary_source, read_data_version,
+                        rows_to_arrow)
 
 DB_PATH = "salary_results.db"
 TABLE = "salary"
 percentile = ['nTile10', 'nTile25', 'nTile50', 'nTile75', 'nTile90']
+STREAM_BATCH_SIZE = 500
+MAX_PER_PAGE = 100
+MAX_STATS_LIMIT = 500
 
 app = Flask(__name__)
+pool = ConnectionPool(DB_PATH)
+if os.path.exists(DB_PATH):
+    enable_wal(DB_PATH)
 
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the calling thread's pooled read-only connection; routes must not close it."""
+    return pool.connection()
+
+
+def current_data_version():
+    try:
+        return read_data_version(get_db_connection())
+    except sqlite3.Error:
+        return None
+
+
+# Set SALARY_API_REDIS_URL to share cached responses between API processes
+cache = ResponseCache(
+    current_data_version,
+    backend=RedisBackend(os.environ["SALARY_API_REDIS_URL"]) if os.environ.get("SALARY_API_REDIS_URL") else None
+)
+# In-memory columnar copy of the salary rows for range and ranking queries; None means query SQLite instead
+snapshots = SnapshotHolder(current_data_version, lambda: SalarySnapshot.load(get_db_connection()))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    API_REQUESTS_IN_FLIGHT.inc()
+
+
+@app.after_request
+def record_request_time(response):
+    """
+    Time the request per route template, so /api/jobs/city/<city> is one series however many cities are asked for.
+
+    Streamed responses are timed until their headers are sent, not until the last chunk.
+    """
+    if "request_started" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        API_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, route=route, method=request.method,
+                                    status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def stop_request_timer(error=None):
+    if g.pop("request_started", None) is not None:
+        API_REQUESTS_IN_FLIGHT.dec()
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Scraper and API metrics of this process, in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def iter_rows(cursor, batch_size=STREAM_BATCH_SIZE):
+    """Yield rows from a cursor a batch at a time, so large result sets are never fetched at once."""
+    while rows := cursor.fetchmany(batch_size):
+        yield from rows
+
+
+def negotiate_encoding():
+    """Pick the best response compression the client accepts: br, then gzip, else none."""
+    accepted = {part.split(";")[0].strip().lower() for part in request.headers.get("Accept-Encoding", "").split(",")}
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_chunks(chunks, encoding):
+    """Compress a stream of text chunks incrementally with gzip or brotli."""
+    compressor = brotli.Compressor(quality=5) if encoding == "br" else zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.process(chunk.encode("utf-8")) if encoding == "br" else compressor.compress(
+            chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.finish() if encoding == "br" else compressor.flush()
+
+
+def streamed_response(chunks, mimetype, headers=None):
+    """
+    Build a chunked response from a generator of text chunks.
+
+    The body is compressed on the fly when the client accepts it, so memory per
+    request stays constant and the first bytes go out before the query finishes.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = negotiate_encoding()
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        chunks = compress_chunks(chunks, encoding)
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
+def json_array_chunks(objects, indent=None):
+    """Serialize an iterable of dicts as a JSON array, one element at a time."""
+    first = True
+    for obj in objects:
+        if indent:
+            item = textwrap.indent(json.dumps(obj, indent=indent), " " * indent)
+            yield ("[\n" if first else ",\n") + item
+        else:
+            yield ("[" if first else ",") + json.dumps(obj, separators=(",", ":"), sort_keys=True)
+        first = False
+    if indent:
+        yield "[]" if first else "\n]"
+    else:
+        # Match jsonify(), which ends the document with a newline
+        yield "[]\n" if first else "]\n"
 
 
 # Get all jobs
@@ -23,76 +154,95 @@ def get_all_jobs():
     conn = get_db_connection()
 
     try:
-        jobs = conn.execute(f"SELECT * FROM {TABLE}").fetchall()
-        conn.close()
-        return jsonify([dict(row) for row in jobs]), 200
+        table = latest_salary_source(conn)
+        cursor = conn.execute(f"SELECT * FROM {table}")
+        return streamed_response(json_array_chunks(dict(row) for row in iter_rows(cursor)), "application/json")
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving jobs."}), 500
 
 
 # Get Jobs by Title
 @app.route('/api/jobs/title/<string:job_title>', methods=['GET'])
+@cache.cached
 def get_jobs_by_title(job_title):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {TABLE} WHERE job_title LIKE ?",
-                       ('%' + job_title + '%',))
+        table = latest_salary_source(conn)
+        match = phrase_query(job_title, "job_title") if has_fts_index(conn) else None
+        if match:
+            cursor.execute(f"SELECT * FROM {table} WHERE id IN "
+                           f"(SELECT rowid FROM salary_fts WHERE salary_fts MATCH ?) ORDER BY id",
+                           (match,))
+        else:
+            cursor.execute(f"SELECT * FROM {table} WHERE job_title LIKE ?",
+                           ('%' + job_title + '%',))
         jobs = cursor.fetchall()
-        conn.close()
         return jsonify([dict(row) for row in jobs]), 200
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving jobs."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 #  Get Jobs by City
 @app.route('/api/jobs/city/<string:city>', methods=['GET'])
+@cache.cached
 def get_jobs_by_city(city):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {TABLE} WHERE job_location LIKE ?",
-                       ('%' + city + '%',))
+        table = latest_salary_source(conn)
+        match = phrase_query(city, "job_location") if has_fts_index(conn) else None
+        if match:
+            cursor.execute(f"SELECT * FROM {table} WHERE id IN "
+                           f"(SELECT rowid FROM salary_fts WHERE salary_fts MATCH ?) ORDER BY id",
+                           (match,))
+        else:
+            cursor.execute(f"SELECT * FROM {table} WHERE job_location LIKE ?",
+                           ('%' + city + '%',))
         jobs = cursor.fetchall()
-        conn.close()
 
         return jsonify([dict(row) for row in jobs]), 200
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving jobs."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 # Get Salary Percentiles for a Job in a City
 @app.route('/api/jobs/salary/<string:job_title>/<string:city>', methods=['GET'])
+@cache.cached
 def get_salary_for_job_city(job_title, city):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        table = latest_salary_source(conn)
         percentile_columns = ", ".join(percentile)
-        cursor.execute(
-            f"SELECT job_title, job_location, {percentile_columns} FROM {TABLE} WHERE job_title LIKE ? AND job_location LIKE ?",
-            ('%' + job_title + '%', '%' + city + '%')
-        )
+        title_match = phrase_query(job_title, "job_title")
+        city_match = phrase_query(city, "job_location")
+        if title_match and city_match and has_fts_index(conn):
+            cursor.execute(
+                f"SELECT job_title, job_location, {percentile_columns} FROM {table} WHERE id IN "
+                f"(SELECT rowid FROM salary_fts WHERE salary_fts MATCH ?) ORDER BY id",
+                (f"{title_match} AND {city_match}",)
+            )
+        else:
+            cursor.execute(
+                f"SELECT job_title, job_location, {percentile_columns} FROM {table} WHERE job_title LIKE ? AND job_location LIKE ?",
+                ('%' + job_title + '%', '%' + city + '%')
+            )
         job = cursor.fetchone()
-        conn.close()
 
         if job:
             return jsonify(dict(job)), 200
@@ -101,122 +251,335 @@ def get_salary_for_job_city(job_title, city):
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving data."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+# Full-text search over titles, locations and descriptions
+@app.route('/api/jobs/search', methods=['GET'])
+@cache.cached
+def search_all_jobs():
+    query = request.args.get('q', default='').strip()
+    mode = request.args.get('mode', default='prefix')
+    limit = min(request.args.get('limit', type=int, default=20), 100)
+    offset = request.args.get('offset', type=int, default=0)
+    if not query:
+        return jsonify({"error": "The 'q' query parameter is required."}), 400
+    if mode not in SEARCH_MODES:
+        return jsonify({"error": f"Invalid mode. Choose from: {', '.join(SEARCH_MODES)}"}), 400
+
+    conn = get_db_connection()
+    try:
+        if not has_fts_index(conn):
+            return jsonify({"error": "Full-text search index is not available."}), 503
+
+        jobs, expression = search_jobs(conn, query, mode=mode, limit=limit, offset=offset)
+        return jsonify({"query": query, "match": expression, "results": [dict(job) for job in jobs]}), 200
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": "An error occurred while searching jobs."}), 500
+
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 #  Get Highest Paying Jobs in a City
 @app.route('/api/jobs/top_paying/<string:city>', methods=['GET'])
+@cache.cached
 def get_top_paying_jobs(city):
+    """
+    Return the best paid jobs of a city, read from the `top_paying` index maintained at ingest.
+
+    Query parameters: `k` (default 10, at most 100), `percentile` to rank by
+    (default nTile90) and `format=html` to render the ranking in the index page.
+    A city matching several locations (e.g. "Portland") gets their merged ranking.
+    Databases without the index (flat, or normalized before it existed) are
+    ranked with a LIKE query over every row instead.
+    """
+    column = request.args.get('percentile', default=percentile[-1])
+    if column not in percentile:
+        return jsonify({"error": f"Invalid percentile. Choose from: {', '.join(percentile)}"}), 400
+    k = max(1, min(request.args.get('k', type=int, default=10), TOP_PAYING_DEPTH))
+
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute(
-            f"SELECT job_title, job_location, {percentile[-1]} FROM {TABLE} WHERE job_location LIKE ? ORDER BY nTile90 DESC LIMIT 10",
-            ('%' + city + '%',)
-        )
-        jobs = cursor.fetchall()
-        conn.close()
-
-        return render_template("index.html")
+        if has_top_paying_index(conn):
+            location_ids = [row[0] for row in cursor.execute(
+                "SELECT id FROM locations WHERE name = ? COLLATE NOCASE", (city,))]
+            if not location_ids:
+                location_ids = [row[0] for row in cursor.execute("SELECT id FROM locations WHERE name LIKE ?",
+                                                                 ('%' + city + '%',))]
+            placeholders = ", ".join("?" for _ in location_ids)
+            cursor.execute(
+                f"SELECT s.job_title, s.job_location, t.value AS {column} FROM top_paying t "
+                f"JOIN {TABLE} s ON s.id = t.salary_id "
+                f"WHERE t.location_id IN ({placeholders}) AND t.percentile = ? AND t.rank <= ? "
+                f"ORDER BY t.value DESC, t.rank LIMIT ?",
+                (*location_ids, column, k, k)
+            )
+        else:
+            table = latest_salary_source(conn)
+            cursor.execute(
+                f"SELECT job_title, job_location, {column} FROM {table} WHERE job_location LIKE ? "
+                f"AND {column} IS NOT NULL ORDER BY {column} DESC, id LIMIT ?",
+                ('%' + city + '%', k)
+            )
+        jobs = [{"rank": rank, **dict(row)} for rank, row in enumerate(cursor.fetchall(), start=1)]
+
+        if request.args.get('format') == 'html':
+            return render_template("index.html", city=city, percentile=column, top_paying=jobs)
+        return jsonify({"city": city, "percentile": column, "k": k, "results": jobs}), 200
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
-        return render_template("index.html")
+        return jsonify({"error": "An error occurred while retrieving top paying jobs."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
-        return render_template("index.html")
+        return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 # Get Jobs in a Salary Range
 @app.route('/api/jobs/salary_range', methods=['GET'])
+@cache.cached
 def get_jobs_by_salary_range():
     conn = get_db_connection()
     try:
         min_salary = request.args.get('min', type=float, default=0)
         max_salary = request.args.get('max', type=float, default=1e9)
 
+        snapshot = snapshots.get()
+        if snapshot is not None:
+            return jsonify(snapshot.rows(snapshot.salary_range(min_salary, max_salary)))
+
         cursor = conn.cursor()
+        table = latest_salary_source(conn)
         cursor.execute(
-            f"SELECT * FROM {TABLE} WHERE nTile50 BETWEEN ? AND ?",
+            f"SELECT * FROM {table} WHERE nTile50 BETWEEN ? AND ?",
             (min_salary, max_salary)
         )
         jobs = cursor.fetchall()
-        conn.close()
 
         return jsonify([dict(job) for job in jobs])
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving data."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 # Get Jobs with Highest Growth Potential
 @app.route('/api/jobs/high_growth', methods=['GET'])
+@cache.cached
 def get_high_growth_jobs():
     conn = get_db_connection()
     try:
+        limit = max(1, min(request.args.get('limit', type=int, default=10), MAX_STATS_LIMIT))
+
+        snapshot = snapshots.get()
+        if snapshot is not None:
+            return jsonify(snapshot.rows(snapshot.high_growth(limit), ["job_title", "job_location", "salary_growth"]))
+
         cursor = conn.cursor()
+        table = latest_salary_source(conn)
         cursor.execute(
-            f"SELECT job_title, job_location, (nTile90 - nTile10) AS salary_growth FROM {TABLE} ORDER BY salary_growth DESC LIMIT 10"
+            f"SELECT job_title, job_location, (nTile90 - nTile10) AS salary_growth FROM {table} "
+            f"ORDER BY salary_growth DESC, id LIMIT ?",
+            (limit,)
         )
         jobs = cursor.fetchall()
-        conn.close()
 
         return jsonify([dict(job) for job in jobs])
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving data."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
 # Pagination Support
+def paginate_filters(conn, filters: dict) -> tuple[list, list]:
+    """Translate the title, city and salary range filters of a paginated query into SQL conditions."""
+    conditions, params = [], []
+    title_match = phrase_query(filters["title"], "job_title") if filters.get("title") else None
+    city_match = phrase_query(filters["city"], "job_location") if filters.get("city") else None
+    matches = [match for match in (title_match, city_match) if match]
+    if matches and has_fts_index(conn):
+        conditions.append("id IN (SELECT rowid FROM salary_fts WHERE salary_fts MATCH ?)")
+        params.append(" AND ".join(matches))
+    else:
+        for column, key in (("job_title", "title"), ("job_location", "city")):
+            if filters.get(key):
+                conditions.append(f"{column} LIKE ?")
+                params.append('%' + filters[key] + '%')
+
+    if filters.get("min_salary") is not None:
+        conditions.append("nTile50 >= ?")
+        params.append(filters["min_salary"])
+    if filters.get("max_salary") is not None:
+        conditions.append("nTile50 <= ?")
+        params.append(filters["max_salary"])
+    return conditions, params
+
+
 @app.route('/api/jobs/paginate', methods=['GET'])
+@cache.cached
 def get_paginated_jobs():
+    """
+    Page through jobs with keyset pagination.
+
+    Each page starts right after the (sort column, id) of the previous page's
+    last row, so every page costs the same however deep it is. The first
+    request picks `sort`, `order` and the optional `title`, `city`,
+    `min_salary` and `max_salary` filters; they are carried in the opaque
+    `next_cursor`, which is all a client has to send for the following page.
+    The legacy `page` parameter still pages with OFFSET.
+    """
     conn = get_db_connection()
     try:
-        page = request.args.get('page', type=int, default=1)
-        per_page = request.args.get('per_page', type=int, default=10)
-        offset = (page - 1) * per_page
+        per_page = max(1, min(request.args.get('per_page', type=int, default=10), MAX_PER_PAGE))
+        table = latest_salary_source(conn)
+
+        if 'page' in request.args and 'cursor' not in request.args:
+            page = max(1, request.args.get('page', type=int, default=1))
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT * FROM {table} ORDER BY id LIMIT ? OFFSET ?",
+                (per_page, (page - 1) * per_page)
+            )
+            jobs = cursor.fetchall()
+            return jsonify([dict(job) for job in jobs])
+
+        token = request.args.get('cursor')
+        if token:
+            try:
+                state = decode_cursor(token)
+            except InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            sort = request.args.get('sort', default='id')
+            order = request.args.get('order', default='asc').lower()
+            if sort not in SORT_COLUMNS:
+                return jsonify({"error": f"Invalid sort. Choose from: {', '.join(SORT_COLUMNS)}"}), 400
+            if order not in SORT_ORDERS:
+                return jsonify({"error": f"Invalid order. Choose from: {', '.join(SORT_ORDERS)}"}), 400
+            filters = {
+                "title": request.args.get('title'),
+                "city": request.args.get('city'),
+                "min_salary": request.args.get('min_salary', type=float),
+                "max_salary": request.args.get('max_salary', type=float),
+            }
+            state = {"sort": sort, "order": order, "filters": filters, "after": None}
+
+        conditions, params = paginate_filters(conn, state["filters"])
+        order_by = order_clause(state["sort"], state["order"])
+        cursor = conn.cursor()
+        jobs = []
+        for condition, segment_params in keyset_segments(state["sort"], state["order"], state["after"]):
+            cursor.execute(
+                f"SELECT * FROM {table} WHERE {' AND '.join(conditions + [condition])} ORDER BY {order_by} LIMIT ?",
+                (*params, *segment_params, per_page + 1 - len(jobs))
+            )
+            jobs.extend(cursor.fetchall())
+            if len(jobs) > per_page:
+                break
+
+        next_cursor = None
+        if len(jobs) > per_page:
+            jobs = jobs[:per_page]
+            last = jobs[-1]
+            next_cursor = encode_cursor({**state, "after": [last[state["sort"]], last["id"]]})
+
+        return jsonify({"results": [dict(job) for job in jobs], "per_page": per_page, "next_cursor": next_cursor})
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": "An error occurred while retrieving data."}), 500
+
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+# Precomputed aggregates per job title, city or state (see rollups.py)
+@app.route('/api/stats/<string:level>', methods=['GET'])
+@cache.cached
+def get_stats(level):
+    if level not in ROLLUP_LEVELS:
+        return jsonify({"error": f"Invalid level. Choose from: {', '.join(ROLLUP_LEVELS)}"}), 404
 
+    conn = get_db_connection()
+    try:
         cursor = conn.cursor()
+        table = rollup_table(level)
+        columns = [row["name"] for row in cursor.execute(f'PRAGMA table_info("{table}")')]
+        if not columns:
+            return jsonify({"error": "Statistics have not been computed yet."}), 503
+
+        sort = request.args.get('sort', default='rank')
+        order = request.args.get('order', default='asc').lower()
+        limit = max(1, min(request.args.get('limit', type=int, default=50), MAX_STATS_LIMIT))
+        offset = max(0, request.args.get('offset', type=int, default=0))
+        if sort not in columns:
+            return jsonify({"error": f"Invalid sort. Choose from: {', '.join(columns)}"}), 400
+        if order not in ("asc", "desc"):
+            return jsonify({"error": "Invalid order. Choose from: asc, desc"}), 400
+
         cursor.execute(
-            f"SELECT * FROM {TABLE} LIMIT ? OFFSET ?",
-            (per_page, offset)
+            f'SELECT * FROM "{table}" ORDER BY {sort} IS NULL, {sort} {order.upper()}, name LIMIT ? OFFSET ?',
+            (limit, offset)
         )
-        jobs = cursor.fetchall()
-        conn.close()
+        stats = cursor.fetchall()
 
-        return jsonify([dict(job) for job in jobs])
+        return jsonify([dict(row) for row in stats])
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
-        return jsonify({"error": "An error occurred while retrieving data."}), 500
+        return jsonify({"error": "An error occurred while retrieving statistics."}), 500
+
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+@app.route('/api/stats/<string:level>/<string:name>', methods=['GET'])
+@cache.cached
+def get_stats_for(level, name):
+    if level not in ROLLUP_LEVELS:
+        return jsonify({"error": f"Invalid level. Choose from: {', '.join(ROLLUP_LEVELS)}"}), 404
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM "{rollup_table(level)}" WHERE name = ? COLLATE NOCASE', (name,))
+        stats = cursor.fetchone()
+
+        if stats:
+            return jsonify(dict(stats)), 200
+        else:
+            return jsonify({"error": "No data found"}), 404
+
+    except sqlite3.OperationalError:
+        return jsonify({"error": "Statistics have not been computed yet."}), 503
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": "An error occurred while retrieving statistics."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
@@ -226,42 +589,30 @@ def export_csv():
     try:
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {TABLE}")
-        jobs = cursor.fetchall()
-        conn.close()
-
-        # Create an in-memory stream for CSV output
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header row
-        writer.writerow(
-            ["job_title", "job_location", "job_description", "nTile10", "nTile25", "nTile50", "nTile75", "nTile90"])
-
-        # Write data rows
-        for job in jobs:
-            writer.writerow([
-                job['job_title'],
-                job['job_location'],
-                job['job_description'],
-                job['nTile10'],
-                job['nTile25'],
-                job['nTile50'],
-                job['nTile75'],
-                job['nTile90']
-            ])
-
-        output.seek(0)  # Seek to the beginning of the stream
-        return Response(output, mimetype='text/csv',
-                        headers={"Content-Disposition": "attachment; filename=salary_data.csv"})
+        columns = ["job_title", "job_location", "job_description", "nTile10", "nTile25", "nTile50", "nTile75", "nTile90"]
+
+        def generate():
+            # Reuse one small buffer: each batch of rows is written, drained and sent
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            while jobs := cursor.fetchmany(STREAM_BATCH_SIZE):
+                writer.writerows([job[column] for column in columns] for job in jobs)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+            if output.tell():
+                yield output.getvalue()
+
+        return streamed_response(generate(), 'text/csv',
+                                 headers={"Content-Disposition": "attachment; filename=salary_data.csv"})
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving data."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
@@ -271,25 +622,60 @@ def export_json():
     try:
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {TABLE}")
-        jobs = cursor.fetchall()
-        conn.close()
+        jobs = (dict(job) for job in iter_rows(cursor))
 
-        json_data = [dict(job) for job in jobs]
-        response = Response(
-            response=json.dumps(json_data, indent=4),
-            mimetype="application/json",
-            headers={"Content-Disposition": "attachment; filename=salary_data.json"}
-        )
-        return response
+        # ?format=ndjson streams one compact JSON object per line instead of an indented array
+        if request.args.get('format') == 'ndjson':
+            return streamed_response((json.dumps(job) + "\n" for job in jobs), "application/x-ndjson",
+                                     headers={"Content-Disposition": "attachment; filename=salary_data.ndjson"})
+
+        return streamed_response(json_array_chunks(jobs, indent=4), "application/json",
+                                 headers={"Content-Disposition": "attachment; filename=salary_data.json"})
+
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": "An error occurred while retrieving data."}), 500
+
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+@app.route('/api/export/parquet', methods=['GET'])
+def export_parquet():
+    conn = get_db_connection()
+    try:
+        all_columns = ["job_title", "job_location", "job_description"] + percentile
+        columns = request.args.get('columns', default=",".join(all_columns)).split(",")
+        if not columns or any(column not in all_columns for column in columns):
+            return jsonify({"error": f"Invalid columns. Choose from: {', '.join(all_columns)}"}), 400
+
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {TABLE}")
+
+        # Write row groups to a temporary file as they are read, then stream the file: neither the table nor
+        # the encoded file is ever held in memory. Parquet keeps its footer at the end, so it can't be sent sooner.
+        schema = arrow_schema(columns)
+        output = tempfile.TemporaryFile()
+        try:
+            with pq.ParquetWriter(output, schema, compression="zstd") as writer:
+                while rows := cursor.fetchmany(50000):
+                    writer.write_table(rows_to_arrow([tuple(row) for row in rows], schema))
+            output.seek(0)
+        except BaseException:
+            output.close()
+            raise
+
+        # The file is closed, and so deleted, once the response has been sent
+        return send_file(output, mimetype="application/vnd.apache.parquet", as_attachment=True,
+                         download_name="salary_data.parquet")
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-        conn.close()
         return jsonify({"error": "An error occurred while retrieving data."}), 500
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        conn.close()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
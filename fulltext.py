@@ -0,0 +1,93 @@
+import difflib
+import re
+import sqlite3
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SEARCH_MODES = ("match", "prefix", "fuzzy")
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)  # bm25 weights for job_title, job_location, job_description
+
+
+def has_fts_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'salary_fts'").fetchone() is not None
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.lower() for token in TOKEN_PATTERN.findall(text or "")]
+
+
+def phrase_query(text: str, column: str = None, prefix: bool = True) -> str | None:
+    """
+    Build an FTS5 expression matching `text` as a phrase, optionally restricted to one column.
+
+    With `prefix`, the last word may be incomplete ("new yo" matches "New York").
+    Returns None if `text` has no searchable words.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    expression = '"' + " ".join(tokens) + '"' + ("*" if prefix else "")
+    return f"{column} : {expression}" if column else expression
+
+
+def terms_query(tokens: list[str], prefix: bool = True) -> str | None:
+    """Build an FTS5 expression requiring every token, in any column and any order."""
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"' + ("*" if prefix else "") for token in tokens)
+
+
+def correct_tokens(conn: sqlite3.Connection, tokens: list[str], cutoff: float = 0.7) -> list[str]:
+    """
+    Replace tokens that match nothing in the index with their closest indexed term.
+
+    Tokens that are already an indexed term or the prefix of one are kept as is.
+    """
+    vocabulary = None
+    corrected = []
+    for token in tokens:
+        known = conn.execute(
+            "SELECT 1 FROM salary_fts_vocab WHERE term >= ? AND term < ? LIMIT 1", (token, token + "\uffff")
+        ).fetchone()
+        if known:
+            corrected.append(token)
+            continue
+
+        if vocabulary is None:
+            vocabulary = [term for term, in conn.execute("SELECT term FROM salary_fts_vocab")]
+        matches = difflib.get_close_matches(token, vocabulary, n=1, cutoff=cutoff)
+        corrected.append(matches[0] if matches else token)
+    return corrected
+
+
+def search_jobs(conn: sqlite3.Connection, query: str, mode: str = "prefix", limit: int = 20, offset: int = 0):
+    """
+    Run a ranked full-text search over job titles, locations and descriptions.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a database with the `salary_fts` index.
+        query (str): Free-text query, e.g. "data scien chicago".
+        mode (str): "match" for whole words, "prefix" to also match word beginnings,
+            "fuzzy" to additionally correct misspelled words (default: "prefix").
+        limit (int): Maximum number of rows to return (default: 20).
+        offset (int): Number of ranked rows to skip (default: 0).
+
+    Returns:
+        tuple: (rows ordered by relevance, the FTS5 expression that was run).
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode '{mode}', choose from: {', '.join(SEARCH_MODES)}")
+
+    tokens = tokenize(query)
+    if mode == "fuzzy":
+        tokens = correct_tokens(conn, tokens)
+    expression = terms_query(tokens, prefix=mode != "match")
+    if expression is None:
+        return [], None
+
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    rows = conn.execute(
+        f"SELECT s.*, bm25(salary_fts, {weights}) AS score FROM salary_fts "
+        f"JOIN salary s ON s.id = salary_fts.rowid WHERE salary_fts MATCH ? ORDER BY score LIMIT ? OFFSET ?",
+        (expression, limit, offset)
+    ).fetchall()
+    return rows, expression
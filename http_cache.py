@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_PATH = "http_cache.db"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    def __init__(self, url, status, headers, body, encoding, etag, last_modified, fetched_at):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+    def conditional_headers(self) -> dict:
+        """Headers that turn the next request for this URL into a conditional one."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a `requests.Response` so cached pages are interchangeable with fetched ones."""
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = self.encoding
+        response.url = self.url
+        response.reason = "OK"
+        return response
+
+
+class ResponseCache:
+    """
+    Persistent on-disk HTTP response cache stored in SQLite.
+
+    Entries are keyed by the SHA-256 of the URL and hold the zlib-compressed body
+    with its ETag/Last-Modified validators. An entry younger than `ttl` seconds is
+    served without touching the network; an older one is revalidated with a
+    conditional request. Once the stored bodies exceed `max_bytes`, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY,
+                                url TEXT NOT NULL,
+                                status INTEGER NOT NULL,
+                                headers TEXT NOT NULL,
+                                body BLOB NOT NULL,
+                                encoding TEXT,
+                                etag TEXT,
+                                last_modified TEXT,
+                                size INTEGER NOT NULL,
+                                fetched_at REAL NOT NULL,
+                                accessed_at REAL NOT NULL
+                                )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        self.conn.commit()
+        self.total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> CacheEntry | None:
+        """Return the cached entry for a URL (fresh or stale), or None on a miss."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, status, headers, body, encoding, etag, last_modified, fetched_at "
+                "FROM responses WHERE key = ?", (cache_key(url),)
+            ).fetchone()
+            if not row:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), cache_key(url)))
+            self.conn.commit()
+
+        url, status, headers, body, encoding, etag, last_modified, fetched_at = row
+        return CacheEntry(url, status, json.loads(headers), zlib.decompress(body), encoding, etag, last_modified,
+                          fetched_at)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def store(self, url: str, status: int, headers: dict, body: bytes, encoding: str = None):
+        """Store a successful response body together with its cache validators."""
+        headers = dict(headers)
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (cache_key(url),)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, encoding, etag, last_modified, "
+                "size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url), url, status, json.dumps(headers), compressed, encoding,
+                 CaseInsensitiveDict(headers).get("ETag"), CaseInsensitiveDict(headers).get("Last-Modified"),
+                 len(compressed), now, now)
+            )
+            self.conn.commit()
+            self.total_size += len(compressed) - (old[0] if old else 0)
+            if self.total_size > self.max_bytes:
+                self._evict()
+
+    def revalidated(self, url: str):
+        """Mark an entry as fresh again after the origin answered 304 Not Modified."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                              (now, now, cache_key(url)))
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until the cache is back under 90% of its cap.
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_size <= target:
+                break
+            evicted.append((key,))
+            self.total_size -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.total_size = 0
+
+    def close(self):
+        self.conn.close()
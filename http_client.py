@@ -0,0 +1,200 @@
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+from metrics import FETCH_SECONDS, FETCHES_IN_FLIGHT, HTTP_CACHE, HTTP_RESPONSES, HTTP_RETRIES
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {"fbclid", "gclid", "ref"}
+
+POOL_SIZE = 10
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.5
+BACKOFF_MAX = 60
+TIMEOUT = 30
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so that links to the same page compare equal.
+
+    Lowercases the scheme and host, drops the default port, the fragment, a
+    trailing slash, duplicate slashes and tracking parameters (utm_*, fbclid,
+    gclid, ref), and sorts the remaining query parameters. The path keeps its
+    case.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = "/".join(segment for segment in parts.path.split("/") if segment)
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS))
+    return urlunsplit((scheme, host, "/" + path if path else "", query, ""))
+
+
+def create_session(pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES, backoff_factor: float = BACKOFF_FACTOR,
+                   backoff_jitter: float = BACKOFF_JITTER) -> requests.Session:
+    """
+    Create a requests session with keep-alive connection pooling and automatic retries.
+
+    Requests answered with 429 or a 5xx status, and connection errors, are retried
+    up to `max_retries` times with exponential backoff plus random jitter. A
+    `Retry-After` header sent by the server takes precedence over the backoff.
+
+    Args:
+        pool_size (int): Maximum number of kept-alive connections per host (default: 10).
+        max_retries (int): Maximum number of retries per request (default: 4).
+        backoff_factor (float): Base of the exponential backoff in seconds (default: 0.5).
+        backoff_jitter (float): Upper bound of the random jitter added to each backoff (default: 0.5).
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        backoff_max=BACKOFF_MAX,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure(**kwargs) -> requests.Session:
+    """Replace the shared session with one built from `create_session(**kwargs)`."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = create_session(**kwargs)
+        return _session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def enable_cache(path: str = CACHE_PATH, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES) -> ResponseCache:
+    """Put a persistent `ResponseCache` in front of every `get()` call."""
+    global _cache
+    disable_cache()
+    _cache = ResponseCache(path, ttl=ttl, max_bytes=max_bytes)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+
+
+def get_cache() -> ResponseCache | None:
+    return _cache
+
+
+def get(url: str, timeout: float = TIMEOUT, **kwargs) -> requests.Response:
+    """
+    Send a GET request through the shared session and raise on HTTP errors.
+
+    When the response cache is enabled, a fresh cached copy is returned without
+    any request, and a stale one is revalidated with If-None-Match/If-Modified-Since
+    so an unchanged page costs a 304 instead of a full download.
+
+    Args:
+        url (str): The URL to fetch.
+        timeout (float): Timeout in seconds for connecting and reading (default: 30).
+
+    Returns:
+        requests.Response: The successful response.
+    """
+    with FETCH_SECONDS.time(client="sync"), FETCHES_IN_FLIGHT.track_inprogress(client="sync"):
+        cache = _cache
+        entry = cache.get(url) if cache else None
+        if entry and cache.is_fresh(entry):
+            HTTP_CACHE.inc(result="hit")
+            return entry.to_response()
+
+        headers = kwargs.pop("headers", {})
+        if entry:
+            headers = {**entry.conditional_headers(), **headers}
+
+        response = get_session().get(url, timeout=timeout, headers=headers, **kwargs)
+        record_response(response)
+        if entry and response.status_code == 304:
+            HTTP_CACHE.inc(result="revalidated")
+            cache.revalidated(url)
+            return entry.to_response()
+
+        if cache:
+            HTTP_CACHE.inc(result="miss")
+        response.raise_for_status()
+        if cache:
+            cache.store(url, response.status_code, response.headers, response.content, response.encoding)
+        return response
+
+
+def record_response(response: requests.Response):
+    """Count the final status of a response, and the statuses and retries urllib3 went through to get it."""
+    retries = getattr(response.raw, "retries", None)
+    for attempt in retries.history if retries else ():
+        HTTP_RETRIES.inc(client="sync")
+        if attempt.status is not None:
+            HTTP_RESPONSES.inc(client="sync", status=attempt.status)
+    HTTP_RESPONSES.inc(client="sync", status=response.status_code)
+
+
+def retry_delay(attempt: int, retry_after: str = None, backoff_factor: float = BACKOFF_FACTOR,
+                backoff_jitter: float = BACKOFF_JITTER) -> float:
+    """
+    Compute how long to wait before retry number `attempt` (starting at 1).
+
+    Uses the same policy as the shared session: a valid `Retry-After` header
+    (seconds or HTTP date) wins, otherwise exponential backoff with jitter.
+    """
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return min(BACKOFF_MAX, max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+            except (TypeError, ValueError):
+                pass
+
+    delay = backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, backoff_jitter)
+    return min(BACKOFF_MAX, delay)
@@ -1,15 +1,22 @@
+import argparse
+import asyncio
 import csv
-import json
-import re
 from time import sleep
 
 import requests
-from bs4 import BeautifulSoup
 
-from formating import Format
+import http_client
+from async_scraper import crawl, salary_page_url
+from crawl_journal import CheckpointWriter, CrawlJournal
+from formating import time_it
+from metrics import COALESCED_FETCHES, PARSE_FAILURES, PARSE_SECONDS, crawl_summary
+from rollups import refresh_rollups
+from salary_history import DEFAULT_MAX_AGE_DAYS, SalaryHistory
+from salary_parser import parse_salary_page
+from salary_record import SalaryRecord
 from scrape_search_result import SearchResult
-from store_data import create_db, insert_records, save_to_csv, save_to_json, save_to_excel
-from test import time_it
+from store_data import CsvSink, ExcelSink, JsonArraySink, ParquetSink, create_normalized_db, write_stream
+from work_queue import DEFAULT_LEASE_SECONDS, Heartbeat, WorkQueue
 
 job_titles = [
     "Python Developer",
@@ -31,25 +38,12 @@ job_titles = [
 ]
 
 
-def save_to_sqlite3_db(data: list[tuple]):
-    dtype_format = Format(job_title="str", job_location="str", job_description="str", nTile10="float", nTile25="float",
-                          nTile50="float", nTile75="float", nTile90="float").format_columns_db()
-    columns_db = dtype_format.col_definition_db
-    db_name, table_name, columns_list = create_db(columns=columns_db)
-    insert_records(db_name, table_name, columns_list, data)
-
 def get_html(web_url):
-    """Fetch the HTML content of a given URL."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-
-    response = requests.get(web_url, headers)
-    response.raise_for_status()
-    return response
+    """Fetch the HTML content of a given URL through the shared pooled session."""
+    return http_client.get(web_url)
 
 
-def extract_salary_info(job_title: str, job_city: str, job_url) -> tuple | None:
+def extract_salary_info(job_title: str, job_city: str, job_url) -> SalaryRecord | None:
     """
         Extract salary information for a given job title and city from Salary.com.
 
@@ -58,7 +52,7 @@ def extract_salary_info(job_title: str, job_city: str, job_url) -> tuple | None:
             job_city (str): The city to search in (e.g., "new york").
 
         Returns:
-            tuple: (job_title, location, description, ntile_10, ntile_25, ntile_50, ntile_75, ntile_90)
+            SalaryRecord: The job title, location, description and salary percentiles,
             or None if data cannot be extracted.
         """
 
@@ -66,90 +60,177 @@ def extract_salary_info(job_title: str, job_city: str, job_url) -> tuple | None:
         print("Error: Both job_title and job_city are required.")
         return None
 
-    url = f"{job_url}/{job_city}"
+    url = salary_page_url(job_url, job_city)
 
     try:
         response = get_html(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        pattern = re.compile(r'Occupation', re.IGNORECASE)
-        script = soup.find('script', {'type': 'application/ld+json'}, string=pattern)
+        with PARSE_SECONDS.time():
+            record = parse_salary_page(response.content)
+        if record is None:
+            PARSE_FAILURES.inc()
+        return record
 
-        if not script:
-            print("Error: Could not find the script tag containing salary data.")
-            return None
+    except requests.RequestException as e:
+        print(f"HTTP request failed: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
 
-        # Parse the JSON data
-        json_raw = script.contents[0]
-        json_data = json.loads(json_raw)
+    return None
 
-        # extract salary data
-        job_title = json_data.get('name', 'N/A')
-        location = json_data.get('occupationLocation', [{}])[0].get('name', 'N/A')
-        description = json_data.get('description', 'N/A')
 
-        salary_data = json_data.get('estimatedSalary', [{}])[0]
-        ntile_10 = salary_data.get('percentile10', 'N/A')
-        ntile_25 = salary_data.get('percentile25', 'N/A')
-        ntile_50 = salary_data.get('median', 'N/A')
-        ntile_75 = salary_data.get('percentile75', 'N/A')
-        ntile_90 = salary_data.get('percentile90', 'N/A')
+def extract_salary_info_once(pages: dict, job_title: str, job_city: str, job_url) -> SalaryRecord | None:
+    """
+    `extract_salary_info()`, fetching each salary page at most once per crawl.
 
-        return job_title, location, description, ntile_10, ntile_25, ntile_50, ntile_75, ntile_90
+    Different job titles often resolve to the same page; `pages` maps the
+    canonical URLs extracted so far to their results and answers the repeats.
+    Failures are not remembered, so a retried unit fetches its page again.
+    """
+    url = salary_page_url(job_url, job_city)
+    if url in pages:
+        COALESCED_FETCHES.inc()
+        return pages[url]
+    result = extract_salary_info(job_title, job_city, job_url)
+    if result is not None:
+        pages[url] = result
+    return result
+
+
+def read_cities(input_file: str) -> list | None:
+    """
+    Read city names from a CSV file.
+
+    Args:
+        input_file (str): Path to the CSV file containing city names.
+
+    Returns:
+        list: A list of city names, or None if the file cannot be read.
+    """
+    try:
+        with open(input_file, newline='', encoding="utf-8") as file:
+            reader = csv.reader(file)
+            return [city.strip() for row in reader for city in row if city.strip()]
+
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
 
-    except requests.RequestException as e:
-        print(f"HTTP request failed: {e}")
-    except json.JSONDecodeError:
-        print("Error: Failed to decode JSON from the script tag.")
-    except KeyError as e:
-        print(f"Error: Missing key in JSON data - {e}")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        print(f"Error reading input file: {e}")
 
     return None
 
 
+def save_results(output_file: str, salary_data) -> int | None:
+    """
+    Save salary data tuples to CSV, Excel, JSON and Parquet files sharing the same base name.
+
+    The rows are streamed to all four files in a single pass, so `salary_data`
+    can be any iterator (such as a database cursor) and is never held in memory.
+
+    Returns:
+        int: The number of rows saved, or None if saving failed.
+    """
+    headers = ['Title', 'Location', 'Description', 'nTile10', 'nTile25', 'nTile50', 'nTile75', 'nTile90']
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    sinks = [CsvSink(output_file, headers), ExcelSink(output_file, headers), JsonArraySink(output_file, headers),
+             ParquetSink(output_file, headers)]
+    if not write_stream(counted(salary_data), sinks):
+        print("Failed to save results.")
+        return None
+
+    return count
+
+
+def start_crawl(journal: CrawlJournal, units: list[tuple], fresh=False, recrawl=False,
+                max_age_days=DEFAULT_MAX_AGE_DAYS, limit=None) -> tuple[SalaryHistory, list[tuple]]:
+    """
+    Pick the units of a crawl and register them in the journal.
+
+    A full crawl takes every unit. A recrawl only takes the units the salary
+    history finds stale (see `SalaryHistory.plan()`); the others are journaled
+    as done with their current salary row, so the exports still cover the
+    whole sweep. Either way, unchanged estimates are not written again.
+
+    Returns:
+        tuple: The SalaryHistory of the database and the (job_title, city) pairs still to crawl.
+    """
+    history = SalaryHistory(journal.conn)
+    pending = journal.start(units, fresh=fresh)
+    if recrawl:
+        due = history.plan(pending, max_age_days, limit)
+        print(f"Recrawl: {len(due)} of {len(units)} units not checked in the last {max_age_days:g} days.")
+        skipped = set(pending) - set(due)
+        journal.settle(history.current(skipped))
+        pending = due
+    return history, pending
+
+
 @time_it
-def main(job_titles: list, input_file='largest_cities.csv', output_file='salary_results'):
+def main(job_titles: list, input_file='largest_cities.csv', output_file='salary_results', fresh=False, recrawl=False,
+         max_age_days=DEFAULT_MAX_AGE_DAYS, limit=None):
     """
        Extract salary data for a given job title from the largest US cities.
 
+       Results are checkpointed to the SQLite database as they arrive, so an
+       interrupted crawl picks up where it stopped when run again.
+
        Args:
            job_title (str): The job title to extract salary data for (e.g., "Software Engineer").
            input_file (str): Path to the CSV file containing city names (default: 'largest_cities.csv').
            output_file (str): Path to the output CSV file (default: 'salary_results.csv').
+           fresh (bool): Ignore the progress of an unfinished previous crawl (default: False).
+           recrawl (bool): Only crawl the units not checked for `max_age_days` (default: False).
+           max_age_days (float): Age after which a recrawl checks a unit again (default: 7).
+           limit (int): Maximum number of units a recrawl checks (default: all that are due).
 
        Returns:
-           list: A list of salary data tuples.
+           int: The number of salary rows saved to the output files.
        """
 
-    try:
-        with open(input_file, newline='', encoding="utf-8") as file:
-            reader = csv.reader(file)
-            cities = [city.strip() for row in reader for city in row if city.strip()]
-
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
+    cities = read_cities(input_file)
+    if cities is None:
         return []
 
-    except Exception as e:
-        print(f"Error reading input file: {e}")
-        return []
-
-    salary_data = []
+    db_name, table_name, columns_list = create_normalized_db()
+    journal = CrawlJournal(db_name)
+    history, pending = start_crawl(journal, [(job, city) for job in job_titles[:3] for city in cities[:3]], fresh,
+                                   recrawl, max_age_days, limit)
+    pending = set(pending)
+    writer = CheckpointWriter(journal, table_name, columns_list, history=history)
     batch_size = 10
+    pages = {}
+    job_links = SearchResult().resolve_many(list(dict.fromkeys(job for job, _ in pending)))
 
     for job in job_titles[:3]:
-        link = SearchResult().scrape_url_structure(job).first_link
+        if job not in job_links:
+            continue
+        if not job_links[job]:
+            print(f"Error: No salary page found for job title '{job}'.")
+            for city in cities[:3]:
+                if (job, city) in pending:
+                    writer.add(job, city, None, "no search result")
+            continue
+
+        link = job_links[job][0]
         print(f"Processing {len(cities)} cities for job title '{job}'...")
 
         for i, city in enumerate(cities[:3], start=1):
+            if (job, city) not in pending:
+                continue
             try:
                 print(f"Processing city {i}/{len(cities)}: {city}...")
-                result = extract_salary_info(job, city, link)
-                if result:
-                    salary_data.append(result)
+                result, error = extract_salary_info_once(pages, job, city, link), None
             except Exception as e:
                 print(f"Error processing city '{city}': {e}")
+                result, error = None, str(e)
+            writer.add(job, city, result, error)
 
             if i % batch_size == 0:
                 print(f"Sleeping after processing {batch_size} cities...")
@@ -157,19 +238,193 @@ def main(job_titles: list, input_file='largest_cities.csv', output_file='salary_
             else:
                 sleep(0.5)
 
-    headers = ['Title', 'Location', 'Description', 'nTile10', 'nTile25', 'nTile50', 'nTile75', 'nTile90']
-    if not save_to_csv(output_file, salary_data, headers) or not save_to_excel(output_file, salary_data,
-                                                                               headers) or not save_to_json(
-        output_file,
-        salary_data,
-        headers
-    ):
-        print("Failed to save results.")
+    writer.flush()
+    refresh_rollups(db_name)
+    saved = save_results(output_file, journal.results(table_name))
+    journal.close()
+    print(crawl_summary())
+
+    return saved or 0
+
+
+@time_it
+def main_async(job_titles: list, input_file='largest_cities.csv', output_file='salary_results', concurrency=10,
+               rate=5.0, parse_workers=0, fresh=False, recrawl=False, max_age_days=DEFAULT_MAX_AGE_DAYS, limit=None):
+    """
+       Extract salary data for every job title and city concurrently.
+
+       Unlike `main()`, pages are fetched with asyncio and a per-host token bucket
+       replaces the fixed sleeps between requests. Results are checkpointed the
+       same way, so an interrupted crawl resumes where it stopped.
+
+       Args:
+           job_titles (list): The job titles to extract salary data for.
+           input_file (str): Path to the CSV file containing city names (default: 'largest_cities.csv').
+           output_file (str): Base name of the output files (default: 'salary_results').
+           concurrency (int): Maximum number of requests in flight at once (default: 10).
+           rate (float): Requests per second allowed for salary.com (default: 5.0).
+           parse_workers (int): Processes parsing fetched pages; 0 parses in the event loop (default: 0).
+           fresh (bool): Ignore the progress of an unfinished previous crawl (default: False).
+           recrawl (bool): Only crawl the units not checked for `max_age_days` (default: False).
+           max_age_days (float): Age after which a recrawl checks a unit again (default: 7).
+           limit (int): Maximum number of units a recrawl checks (default: all that are due).
+
+       Returns:
+           int: The number of salary rows saved to the output files.
+       """
+
+    cities = read_cities(input_file)
+    if cities is None:
         return []
 
-    return salary_data
+    db_name, table_name, columns_list = create_normalized_db()
+    journal = CrawlJournal(db_name)
+    history, pending = start_crawl(journal, [(job, city) for job in job_titles for city in cities], fresh, recrawl,
+                                   max_age_days, limit)
+    writer = CheckpointWriter(journal, table_name, columns_list, history=history)
+
+    resolved = SearchResult().resolve_many(list(dict.fromkeys(job for job, _ in pending)))
+    job_links = {job: links[0] if links else None for job, links in resolved.items()}
+
+    print(f"Processing {len(pending)} title/city pairs for {len(job_links)} job titles...")
+    asyncio.run(crawl(job_links, cities, concurrency=concurrency, rate=rate, parse_workers=parse_workers,
+                      units=pending, on_result=writer.add))
+
+    writer.flush()
+    refresh_rollups(db_name)
+    saved = save_results(output_file, journal.results(table_name))
+    journal.close()
+    print(crawl_summary())
+
+    return saved or 0
+
+
+def worker(job_titles: list, input_file='largest_cities.csv', worker_id=None, batch_size=5,
+           lease_seconds=DEFAULT_LEASE_SECONDS, delay=0.5, poll_interval=5.0, base_url="https://www.salary.com",
+           fresh=False) -> int:
+    """
+       Run one crawl worker against the shared work queue until the queue is drained.
+
+       Any number of workers, on one machine or several, can run at once: each
+       fills the queue with every job title/city pair (units already queued are
+       left alone), then repeatedly leases `batch_size` units, crawls them while a
+       heartbeat keeps the leases alive, and commits the salary rows together with
+       the units' completion. Units of a worker that dies are picked up by the
+       others once their lease expires. The last worker to finish refreshes the
+       rollups.
+
+       Args:
+           job_titles (list): The job titles to extract salary data for.
+           input_file (str): Path to the CSV file containing city names (default: 'largest_cities.csv').
+           worker_id (str): Name of this worker in the queue (default: hostname:pid).
+           batch_size (int): Units leased and committed at a time (default: 5).
+           lease_seconds (float): Seconds a lease lasts without a heartbeat (default: 120).
+           delay (float): Seconds to wait between requests (default: 0.5).
+           poll_interval (float): Seconds to wait when every remaining unit is leased by other workers (default: 5).
+           base_url (str): Site to crawl (default: "https://www.salary.com").
+           fresh (bool): Empty the queue first, starting a new sweep; only pass it to one worker (default: False).
+
+       Returns:
+           int: The number of units this worker processed.
+       """
+    cities = read_cities(input_file)
+    if cities is None:
+        return 0
+
+    db_name, table_name, columns_list = create_normalized_db()
+    queue = WorkQueue(db_name, worker_id, lease_seconds=lease_seconds)
+    added = queue.fill([(job, city) for job in job_titles for city in cities], fresh=fresh)
+    if added:
+        print(f"Queued {added} title/city pairs.")
+    writer = CheckpointWriter(queue, table_name, columns_list, batch_size=batch_size,
+                              history=SalaryHistory(queue.conn))
+    search = SearchResult(base_url)
+    job_links = {}
+    pages = {}
+    processed = 0
+
+    print(f"Worker {queue.worker_id} started.")
+    try:
+        while True:
+            units = queue.lease(batch_size)
+            if not units:
+                if not queue.remaining():
+                    break
+                sleep(poll_interval)
+                continue
+
+            with Heartbeat(queue):
+                # Keywords whose search failed are searched again: their units have attempts left
+                missing = list(dict.fromkeys(job for job, _ in units if not job_links.get(job)))
+                if missing:
+                    job_links.update(search.resolve_many(missing))
+                for job, city in units:
+                    links = job_links.get(job)
+                    if not links:
+                        writer.add(job, city, None, "no search result")
+                        continue
+                    fetched = salary_page_url(links[0], city) not in pages
+                    writer.add(job, city, extract_salary_info_once(pages, job, city, links[0]))
+                    if fetched:
+                        sleep(delay)
+                writer.flush()
+            processed += len(units)
+            print(f"Worker {queue.worker_id}: {processed} units processed, {queue.remaining()} left in the queue.")
+
+    except KeyboardInterrupt:
+        print(f"Worker {queue.worker_id} interrupted, returning its leases to the queue.")
+    finally:
+        try:
+            writer.flush()
+        finally:
+            queue.release()
+
+    if not queue.remaining():
+        refresh_rollups(db_name)
+    print(f"Worker {queue.worker_id} finished: {queue.summary()}")
+    queue.close()
+    print(crawl_summary())
+    return processed
 
 
 if __name__ == '__main__':
-    record = main(job_titles)
-    save_to_sqlite3_db(record)
+    parser = argparse.ArgumentParser(description="Scrape salary data from Salary.com.")
+    parser.add_argument("command", nargs="?", choices=("crawl", "worker"), default="crawl",
+                        help="crawl in this process, or run a worker sharing the crawl queue with other workers")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="fetch pages concurrently with asyncio")
+    parser.add_argument("--concurrency", type=int, default=10, help="maximum requests in flight (async mode)")
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second per host (async mode)")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="processes parsing pages in parallel with fetching (async mode)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="start a new crawl instead of resuming an unfinished one")
+    parser.add_argument("--no-cache", action="store_true", help="always download pages instead of using the HTTP cache")
+    parser.add_argument("--cache-ttl", type=float, default=http_client.DEFAULT_TTL,
+                        help="seconds a cached page is served without revalidation")
+    parser.add_argument("--recrawl", action="store_true",
+                        help="only crawl units not checked for --max-age-days, revalidating their cached pages")
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="days after which a recrawl checks a unit again")
+    parser.add_argument("--limit", type=int, help="maximum number of units a recrawl checks")
+    parser.add_argument("--worker-id", help="name of this worker in the queue (worker mode, default: hostname:pid)")
+    parser.add_argument("--batch-size", type=int, default=5, help="units leased at a time (worker mode)")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="seconds a lease lasts without a heartbeat (worker mode)")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds between requests (worker mode)")
+    parser.add_argument("--base-url", default="https://www.salary.com", help="site to crawl (worker mode)")
+    args = parser.parse_args()
+
+    if not args.no_cache:
+        # A recrawl only picks stale units, so their cached pages are always revalidated instead of served as is
+        http_client.enable_cache(ttl=0 if args.recrawl else args.cache_ttl)
+
+    planning = dict(fresh=args.fresh, recrawl=args.recrawl, max_age_days=args.max_age_days, limit=args.limit)
+    if args.command == "worker":
+        worker(job_titles, worker_id=args.worker_id, batch_size=args.batch_size, lease_seconds=args.lease_seconds,
+               delay=args.delay, base_url=args.base_url, fresh=args.fresh)
+    elif args.use_async:
+        main_async(job_titles, concurrency=args.concurrency, rate=args.rate, parse_workers=args.parse_workers,
+                   **planning)
+    else:
+        main(job_titles, **planning)
@@ -0,0 +1,258 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """
+    Base class of the metric types: a named family of values, one per combination of label values.
+
+    Label values are passed as keyword arguments (`HTTP_RESPONSES.inc(status=200)`)
+    and must use exactly the label names the metric was declared with.
+    """
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def label_text(self, key: tuple, extra: str = None) -> str:
+        pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self):
+        with self.lock:
+            return [(f"{self.name}{self.label_text(key)}", value) for key, value in sorted(self.values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{sample} {format_value(value)}" for sample, value in self.samples())
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self.key(labels), 0)
+
+    def total(self) -> float:
+        with self.lock:
+            return sum(self.values.values())
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram, rendered like a Prometheus one.
+
+    Quantiles for the crawl summary are estimated from the buckets, by linear
+    interpolation inside the bucket the quantile falls in.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, in seconds."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def count(self, **labels) -> int:
+        state = self.values.get(self.key(labels))
+        return sum(state[0]) if state else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        state = self.values.get(self.key(labels))
+        if not state or not sum(state[0]):
+            return None
+        counts = state[0]
+        rank = q * sum(counts)
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = f'le="{format_value(bound)}"'
+                    samples.append((f"{self.name}_bucket{self.label_text(key, le)}", cumulative))
+                samples.append((f"{self.name}_sum{self.label_text(key)}", total))
+                samples.append((f"{self.name}_count{self.label_text(key)}", cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+# Scraper
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    "scraper_fetch_seconds", "Time to fetch a page, including retries and cache lookups.", ("client",)))
+PARSE_SECONDS = REGISTRY.register(Histogram(
+    "scraper_parse_seconds", "Time to parse a salary page."))
+WRITE_SECONDS = REGISTRY.register(Histogram(
+    "scraper_write_seconds", "Time to write a batch of results to the database.", ("writer",)))
+WRITTEN_ROWS = REGISTRY.register(Counter(
+    "scraper_written_rows_total", "Salary rows written to the database.", ("writer",)))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    "scraper_http_responses_total", "HTTP responses received, by status code.", ("client", "status")))
+HTTP_RETRIES = REGISTRY.register(Counter(
+    "scraper_http_retries_total", "Requests retried after an error status or connection failure.", ("client",)))
+HTTP_CACHE = REGISTRY.register(Counter(
+    "scraper_http_cache_total", "Response cache lookups: fresh hits, 304 revalidations and misses.", ("result",)))
+PARSE_FAILURES = REGISTRY.register(Counter(
+    "scraper_parse_failures_total", "Fetched pages without usable salary data."))
+FETCHES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "scraper_fetches_in_flight", "Page fetches currently in progress.", ("client",)))
+COALESCED_FETCHES = REGISTRY.register(Counter(
+    "scraper_coalesced_fetches_total", "Units answered by the fetch of the same page for another unit."))
+DUPLICATE_PAYLOADS = REGISTRY.register(Counter(
+    "scraper_duplicate_payloads_total", "Units whose salary payload was already stored under another title."))
+HISTORY_UNITS = REGISTRY.register(Counter(
+    "scraper_history_units_total", "Crawled units whose salary estimate was new, changed or unchanged.", ("result",)))
+
+# API
+API_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "api_request_seconds", "Time to handle an API request.", ("route", "method", "status")))
+API_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "api_requests_in_flight", "API requests currently being handled."))
+API_CACHE = REGISTRY.register(Counter(
+    "api_response_cache_total", "API response cache lookups.", ("result",)))
+
+
+def milliseconds(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def crawl_summary() -> str:
+    """Summarize the scraper metrics recorded so far in this process, for printing at the end of a crawl."""
+    lines = ["Crawl summary:"]
+    for client in ("sync", "async"):
+        count = FETCH_SECONDS.count(client=client)
+        if count:
+            p50, p95 = FETCH_SECONDS.quantile(0.5, client=client), FETCH_SECONDS.quantile(0.95, client=client)
+            lines.append(f"  fetch ({client}): {count} pages, p50 {milliseconds(p50)}, p95 {milliseconds(p95)}")
+    by_status = {}
+    for (_, status), count in list(HTTP_RESPONSES.values.items()):
+        by_status[status] = by_status.get(status, 0) + count
+    statuses = ", ".join(f"{status}: {int(count)}" for status, count in sorted(by_status.items()))
+    lines.append(f"  http statuses: {statuses or '-'}; retries: {int(HTTP_RETRIES.total())}")
+    hits, revalidated, misses = (int(HTTP_CACHE.get(result=result)) for result in ("hit", "revalidated", "miss"))
+    lines.append(f"  response cache: {hits} hits, {revalidated} revalidated, {misses} misses")
+    lines.append(f"  parse: {PARSE_SECONDS.count()} pages, p50 {milliseconds(PARSE_SECONDS.quantile(0.5))}, "
+                 f"p95 {milliseconds(PARSE_SECONDS.quantile(0.95))}, {int(PARSE_FAILURES.total())} failures")
+    if COALESCED_FETCHES.total() or DUPLICATE_PAYLOADS.total():
+        lines.append(f"  dedup: {int(COALESCED_FETCHES.total())} coalesced fetches, "
+                     f"{int(DUPLICATE_PAYLOADS.total())} duplicate payloads")
+    if HISTORY_UNITS.total():
+        new, changed, unchanged = (int(HISTORY_UNITS.get(result=result)) for result in ("new", "changed", "unchanged"))
+        lines.append(f"  history: {new} new, {changed} changed, {unchanged} unchanged")
+    for key, count in sorted(WRITTEN_ROWS.values.items()):
+        writer = key[0]
+        lines.append(f"  write ({writer}): {int(count)} rows in {WRITE_SECONDS.count(writer=writer)} batches, "
+                     f"p95 {milliseconds(WRITE_SECONDS.quantile(0.95, writer=writer))} per batch")
+    return "\n".join(lines)
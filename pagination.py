@@ -0,0 +1,89 @@
+import base64
+import binascii
+import json
+
+SORT_COLUMNS = ("id", "nTile10", "nTile25", "nTile50", "nTile75", "nTile90")
+SORT_ORDERS = ("asc", "desc")
+TEXT_FILTERS = ("title", "city")
+NUMBER_FILTERS = ("min_salary", "max_salary")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state: dict) -> str:
+    """Pack the query state and the last row's sort key into an opaque, URL-safe token."""
+    data = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def valid_filters(filters) -> bool:
+    """Text filters must be strings and salary bounds numbers; either may be null, and no other key is allowed."""
+    if not isinstance(filters, dict) or not set(filters) <= set(TEXT_FILTERS + NUMBER_FILTERS):
+        return False
+    return (all(filters.get(key) is None or isinstance(filters[key], str) for key in TEXT_FILTERS)
+            and all(filters.get(key) is None or is_number(filters[key]) for key in NUMBER_FILTERS))
+
+
+def decode_cursor(token: str) -> dict:
+    """Unpack a token from `encode_cursor()`, raising InvalidCursor if it was not produced by it."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    if (not isinstance(state, dict) or state.get("sort") not in SORT_COLUMNS
+            or state.get("order") not in SORT_ORDERS or not isinstance(state.get("after"), list)
+            or len(state["after"]) != 2 or not (state["after"][0] is None or is_number(state["after"][0]))
+            or not isinstance(state["after"][1], int) or isinstance(state["after"][1], bool)
+            or not valid_filters(state.get("filters"))):
+        raise InvalidCursor("Malformed cursor")
+    return state
+
+
+def keyset_segments(sort: str, order: str, after: list | None) -> list[tuple[str, list]]:
+    """
+    Build the WHERE conditions selecting the rows that follow `after` in (sort, id) order.
+
+    Rows are ordered by the sort column and then by id, so ties never repeat or
+    skip a row between pages. Each condition is a range seek on the column's
+    index: the (value, id) pair is compared as a row value, which SQLite can
+    seek to directly, where the equivalent OR of comparisons makes it scan.
+    Row values never match NULLs, so rows without a value for the sort column
+    get their own segment, placed where SQLite sorts them: first in ascending
+    order, last in descending order. The caller queries the segments in order
+    until a page is full.
+
+    Args:
+        sort (str): One of SORT_COLUMNS.
+        order (str): "asc" or "desc".
+        after (list): [sort value, id] of the last row of the previous page, or None for the first page.
+
+    Returns:
+        list: (SQL condition, parameters) pairs, in result order.
+    """
+    op = ">" if order == "asc" else "<"
+    if sort == "id":
+        return [(f"id {op} ?", [after[1]])] if after else [("1", [])]
+
+    nulls, values = (f"{sort} IS NULL", []), (f"{sort} IS NOT NULL", [])
+    if after and after[0] is None:
+        nulls = (f"{sort} IS NULL AND id {op} ?", [after[1]])
+    elif after:
+        values = (f"({sort}, id) {op} (?, ?)", list(after))
+
+    segments = [nulls, values] if order == "asc" else [values, nulls]
+    if after:
+        # Skip the segment the previous pages have already finished
+        segments = segments[segments.index(nulls if after[0] is None else values):]
+    return segments
+
+
+def order_clause(sort: str, order: str) -> str:
+    direction = order.upper()
+    return f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
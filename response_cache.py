@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+from metrics import API_CACHE
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1024
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class CachedResponse:
+    __slots__ = ("body", "mimetype", "etag")
+
+    def __init__(self, body: bytes, mimetype: str, etag: str):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+
+
+class MemoryBackend:
+    """
+    In-process LRU store with a per-entry time to live.
+
+    This is the default backend and the local stand-in for a shared one: any
+    object with the same `get`, `set` and `clear` methods can replace it.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisBackend:
+    """
+    Backend shared by every API worker, stored in Redis.
+
+    Requires the `redis` package, which is only imported when this backend is
+    used. Expiry is left to Redis; entries of old data versions are never read
+    again and simply expire.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "salary-api:", client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> CachedResponse | None:
+        item = self.client.hgetall(self.prefix + key)
+        if not item:
+            return None
+        return CachedResponse(item[b"body"], item[b"mimetype"].decode(), item[b"etag"].decode())
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        pipe = self.client.pipeline()
+        pipe.hset(self.prefix + key, mapping={"body": value.body, "mimetype": value.mimetype, "etag": value.etag})
+        pipe.expire(self.prefix + key, max(1, int(ttl)))
+        pipe.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """
+    Caches successful JSON responses of read-only API routes.
+
+    Entries are keyed by the database's data version, the request path and its
+    sorted query arguments. Writers bump the data version (see
+    `store_data.bump_data_version()`), so after a crawl every key changes and
+    stale entries are never served; they age out of the LRU or expire. The
+    version itself is read from SQLite at most once per `version_interval`
+    seconds, so repeated requests are answered without touching the database.
+    Responses carry an ETag, and requests whose If-None-Match matches it get an
+    empty 304.
+
+    Args:
+        version_source (callable): Returns the current data version.
+        backend: Store with `get`, `set` and `clear` methods (default: a new MemoryBackend).
+        ttl (float): Seconds an entry may be served, whatever the data version (default: 300).
+        version_interval (float): Seconds between data version checks (default: 1.0).
+    """
+
+    def __init__(self, version_source, backend=None, ttl: float = DEFAULT_TTL,
+                 version_interval: float = VERSION_CHECK_INTERVAL):
+        self.version_source = version_source
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.version_interval = version_interval
+        self.version = None
+        self.version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self):
+        now = time.monotonic()
+        if self.version is None or now - self.version_checked_at >= self.version_interval:
+            self.version = self.version_source()
+            self.version_checked_at = now
+        return self.version
+
+    def key(self) -> str:
+        args = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        return f"{self.data_version()}:{request.path}?{args}"
+
+    def cached(self, view):
+        """Decorator serving a route from the cache; only 200 responses that are not streamed are stored."""
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self.key()
+            entry = self.backend.get(key)
+            if entry is None:
+                self.misses += 1
+                API_CACHE.inc(result="miss")
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(body, response.mimetype, hashlib.blake2b(body, digest_size=16).hexdigest())
+                self.backend.set(key, entry, self.ttl)
+            else:
+                self.hits += 1
+                API_CACHE.inc(result="hit")
+
+            response = Response(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response.make_conditional(request)
+
+        return wrapper
+
+    def clear(self):
+        self.backend.clear()
+        self.version = None
@@ -0,0 +1,129 @@
+import sqlite3
+
+import pandas as pd
+
+from store_data import PERCENTILE_COLUMNS, bump_data_version, latest_salary_source
+
+ROLLUP_LEVELS = {"titles": "job_title", "cities": "job_location", "states": "state"}
+
+
+def rollup_table(level: str) -> str:
+    return f"stats_by_{level}"
+
+
+def load_salaries(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Read the latest scrape of every title and location; older scrapes would weigh a job once per crawl."""
+    columns = ", ".join(PERCENTILE_COLUMNS)
+    df = pd.read_sql_query(f"SELECT job_title, job_location, {columns} FROM {latest_salary_source(conn)}", conn)
+    df[PERCENTILE_COLUMNS] = df[PERCENTILE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return df
+
+
+def compute_rollups(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Aggregate salary rows per job title, per city and per state.
+
+    Every level gets the row count, the mean and median of each percentile, the
+    mean and median spread (nTile90 - nTile10) and its rank by median salary
+    (1 = best paid). Cities and states also get a location index: the median
+    over their rows of the row's median salary divided by the national median
+    of the same job title, times 100. 100 means the location pays the national
+    rate, 120 that its jobs pay 20% more than the same jobs elsewhere.
+
+    Args:
+        df (pandas.DataFrame): Salary rows with job_title, job_location and the percentile columns.
+
+    Returns:
+        dict: Level name ("titles", "cities", "states") -> one row per group, keyed by `name`.
+    """
+    df = df.assign(
+        spread=df["nTile90"] - df["nTile10"],
+        state=df["job_location"].str.rsplit(",", n=1).str[-1].str.strip(),
+        location_ratio=df["nTile50"] / df.groupby("job_title")["nTile50"].transform("median"),
+    )
+    value_columns = PERCENTILE_COLUMNS + ["spread"]
+
+    rollups = {}
+    for level, key in ROLLUP_LEVELS.items():
+        groups = df.dropna(subset=[key]).groupby(key)
+        stats = groups[value_columns].agg(["mean", "median"])
+        stats.columns = [f"{stat}_{column}" for column, stat in stats.columns]
+        stats.insert(0, "rows", groups.size())
+        stats["rank"] = stats["median_nTile50"].rank(ascending=False, method="min")
+        if key != "job_title":
+            stats["location_index"] = groups["location_ratio"].median() * 100
+        stats = stats.round(2).rename_axis("name").reset_index()
+        rollups[level] = stats.sort_values(["rank", "name"], na_position="last", ignore_index=True)
+    return rollups
+
+
+def read_rollup(conn: sqlite3.Connection, table: str) -> tuple[list, list] | None:
+    """Return the column names and rows of a rollup table, or None if it does not exist."""
+    try:
+        cursor = conn.execute(f'SELECT * FROM "{table}" ORDER BY rowid')
+    except sqlite3.OperationalError:
+        return None
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def save_rollups(conn: sqlite3.Connection, rollups: dict[str, pd.DataFrame]) -> bool:
+    """
+    Replace the rollup tables in one transaction, so readers never see a partial refresh.
+
+    Tables whose content did not change are left alone, and the data version is
+    only bumped if one did, so an unchanged refresh keeps the API's caches warm.
+
+    Returns:
+        bool: True if any rollup table changed.
+    """
+    changed = False
+    with conn:
+        conn.execute("BEGIN")
+        for level, stats in rollups.items():
+            table = rollup_table(level)
+            columns = list(stats.columns)
+            # object dtype turns NaN into None (NULL) and NumPy scalars into Python numbers
+            values = stats.astype({"rows": "Int64", "rank": "Int64"}).astype(object)
+            rows = [tuple(row) for row in values.where(stats.notna(), None).values.tolist()]
+            if read_rollup(conn, table) == (columns, rows):
+                continue
+
+            changed = True
+            types = ["TEXT PRIMARY KEY" if column == "name" else "INTEGER" if column in ("rows", "rank") else "REAL"
+                     for column in columns]
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'CREATE TABLE "{table}" ({", ".join(f"{c} {t}" for c, t in zip(columns, types))})')
+            conn.execute(f'CREATE INDEX "idx_{table}_rank" ON "{table}" (rank)')
+            placeholders = ", ".join("?" for _ in columns)
+            conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+        if changed:
+            bump_data_version(conn.cursor())
+    return changed
+
+
+def refresh_rollups(db_name: str = "salary_results.db") -> bool:
+    """
+    Recompute the per title, city and state rollup tables from the latest salary rows.
+
+    Run after every crawl. The API serves the tables through `/api/stats/...`.
+
+    Args:
+        db_name (str): Database using the normalized schema (default: "salary_results.db").
+
+    Returns:
+        bool: True if the tables are up to date, False if an error occurred.
+    """
+    try:
+        with sqlite3.connect(db_name) as conn:
+            df = load_salaries(conn)
+            changed = save_rollups(conn, compute_rollups(df))
+        print(f"{'Refreshed' if changed else 'Unchanged'} salary rollups from {len(df)} rows.")
+        return True
+
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"Error refreshing rollups: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    refresh_rollups()
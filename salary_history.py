@@ -0,0 +1,207 @@
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from metrics import DUPLICATE_PAYLOADS, HISTORY_UNITS
+from salary_record import PERCENTILE_FIELDS, SalaryRecord
+from store_data import coerce_record, insert_normalized_record
+
+DEFAULT_MAX_AGE_DAYS = 7
+
+HISTORY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS salary_history (
+    id INTEGER PRIMARY KEY,
+    job_title TEXT NOT NULL,
+    city TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    salary_id INTEGER,
+    nTile10 REAL,
+    nTile25 REAL,
+    nTile50 REAL,
+    nTile75 REAL,
+    nTile90 REAL,
+    valid_from TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_salary_history_unit ON salary_history (job_title, city, valid_from);
+CREATE TABLE IF NOT EXISTS crawl_units (
+    job_title TEXT NOT NULL,
+    city TEXT NOT NULL,
+    content_hash TEXT,
+    salary_id INTEGER,
+    checked_at TEXT,
+    changed_at TEXT,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_title, city)
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_units_checked ON crawl_units (checked_at);
+CREATE TABLE IF NOT EXISTS title_aliases (
+    alias TEXT PRIMARY KEY,
+    title_id INTEGER REFERENCES job_titles (id),
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_title_aliases_title ON title_aliases (title_id);
+'''
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def content_hash(record) -> str:
+    """
+    Hash the salary estimate of a parsed page: its five percentiles.
+
+    Text fields are left out on purpose, so a reworded description or a renamed
+    location does not count as a new salary version.
+    """
+    _, _, _, *percentiles = coerce_record(record)
+    canonical = "|".join("" if value is None else repr(float(value)) for value in percentiles)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def payload_hash(record) -> str:
+    """Hash everything a parsed page carries (title, location, description and percentiles), to spot identical pages."""
+    canonical = "|".join("" if value is None else repr(value) for value in coerce_record(record))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+class SalaryHistory:
+    """
+    Time series of the salary estimate of every (job title, city) unit.
+
+    `crawl_units` keeps the content hash of each unit's latest estimate and when
+    it was last checked and last changed; `salary_history` keeps one row per
+    distinct estimate, with the date it was first seen. A recrawled page whose
+    hash matches the stored one writes no salary row and no history row: only
+    the unit's check time moves. That, together with the HTTP cache turning an
+    unchanged page into a 304, makes a refresh of unchanged data cost one
+    conditional request per unit.
+
+    Search keywords often resolve to the same page ("Python Developer" to
+    "Frontend Developer I"). A payload already stored during this crawl, under
+    whatever title, is not written again: the unit points at the stored row,
+    and `title_aliases` maps the keyword to the page's job title.
+
+    The tables live in the crawl's normalized database, so `record()` runs inside
+    the same transaction as the crawl journal.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.payloads = {}  # (payload hash, scrape date) -> salary_facts id, for this crawl
+        conn.executescript(HISTORY_SCHEMA)
+
+    def record(self, cursor: sqlite3.Cursor, job_title: str, city: str, result) -> tuple[int, bool]:
+        """
+        Store a crawled estimate if it differs from the unit's latest one, inside the caller's transaction.
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the open transaction.
+            job_title (str): Job title of the unit, as crawled.
+            city (str): City slug of the unit, as crawled.
+            result: The parsed SalaryRecord (or 8-tuple).
+
+        Returns:
+            tuple: The unit's current `salary_facts` id (the existing one when nothing changed or the payload was
+            already stored) and whether a salary row was inserted.
+        """
+        digest = content_hash(result)
+        now = utc_now()
+        current = cursor.execute('SELECT content_hash, salary_id FROM crawl_units WHERE job_title = ? AND city = ?',
+                                 (job_title, city)).fetchone()
+        if current and current[0] == digest and current[1] is not None:
+            cursor.execute('UPDATE crawl_units SET checked_at = ?, checks = checks + 1 '
+                           'WHERE job_title = ? AND city = ?', (now, job_title, city))
+            HISTORY_UNITS.inc(result="unchanged")
+            return current[1], False
+
+        payload = (payload_hash(result), now[:10])
+        salary_id = self.payloads.get(payload)
+        inserted = salary_id is None
+        if inserted:
+            salary_id = self.payloads[payload] = insert_normalized_record(cursor, result, now[:10])
+        else:
+            DUPLICATE_PAYLOADS.inc()
+        cursor.execute('''INSERT INTO title_aliases (alias, title_id, updated_at)
+                          SELECT ?, title_id, ? FROM salary_facts WHERE id = ?
+                          ON CONFLICT (alias) DO UPDATE SET title_id = excluded.title_id,
+                              updated_at = excluded.updated_at''',
+                       (job_title, now, salary_id))
+        _, _, _, *percentiles = coerce_record(result)
+        cursor.execute(f'INSERT INTO salary_history (job_title, city, content_hash, salary_id, '
+                       f'{", ".join(PERCENTILE_FIELDS)}, valid_from) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       (job_title, city, digest, salary_id, *percentiles, now))
+        cursor.execute('''INSERT INTO crawl_units (job_title, city, content_hash, salary_id, checked_at, changed_at,
+                                                   checks, changes)
+                          VALUES (?, ?, ?, ?, ?, ?, 1, 1)
+                          ON CONFLICT (job_title, city) DO UPDATE SET
+                              content_hash = excluded.content_hash, salary_id = excluded.salary_id,
+                              checked_at = excluded.checked_at, changed_at = excluded.changed_at,
+                              checks = checks + 1, changes = changes + 1''',
+                       (job_title, city, digest, salary_id, now, now))
+        HISTORY_UNITS.inc(result="changed" if current else "new")
+        return salary_id, inserted
+
+    def plan(self, units: list[tuple], max_age_days: float = DEFAULT_MAX_AGE_DAYS, limit: int = None) -> list[tuple]:
+        """
+        Pick the units a refresh should recrawl: the ones not checked for `max_age_days`, most overdue first.
+
+        Units that were never crawled come first. A unit whose estimate changed
+        at its last check (not counting its first crawl) is due after half the
+        interval, since pages that just moved tend to move again.
+
+        Args:
+            units (list): Every (job_title, city) pair of the full crawl.
+            max_age_days (float): Days after which an unchanged unit is checked again (default: 7).
+            limit (int): Maximum number of units to return, to spread a refresh over several runs.
+
+        Returns:
+            list: The (job_title, city) pairs due for a recrawl.
+        """
+        now = datetime.now(timezone.utc)
+        max_age = timedelta(days=max_age_days)
+        state = {(job, city): rest for job, city, *rest in self.conn.execute(
+            'SELECT job_title, city, checked_at, changed_at, changes FROM crawl_units')}
+
+        due = []
+        for position, unit in enumerate(units):
+            checked_at, changed_at, changes = state.get(unit, (None, None, 0))
+            if checked_at is None:
+                due.append((float("inf"), -position, unit))
+                continue
+            age = now - datetime.fromisoformat(checked_at)
+            interval = max_age / 2 if changes > 1 and changed_at == checked_at else max_age
+            if age >= interval:
+                due.append(((age - interval).total_seconds(), -position, unit))
+
+        due.sort(reverse=True)
+        return [unit for _, _, unit in due[:limit]]
+
+    def current(self, units: list[tuple]) -> dict:
+        """Map the given (job_title, city) pairs that were crawled before to their current `salary_facts` id."""
+        wanted = set(units)
+        return {(job, city): salary_id for job, city, salary_id in self.conn.execute(
+            'SELECT job_title, city, salary_id FROM crawl_units WHERE salary_id IS NOT NULL')
+            if (job, city) in wanted}
+
+    def versions(self, job_title: str, city: str) -> list[tuple[str, SalaryRecord]]:
+        """Return every distinct estimate of a unit, oldest first, as (valid_from, SalaryRecord) pairs."""
+        rows = self.conn.execute(
+            f'SELECT h.valid_from, s.job_title, s.job_location, s.job_description, '
+            f'{", ".join("h." + field for field in PERCENTILE_FIELDS)} FROM salary_history h '
+            f'LEFT JOIN salary s ON s.id = h.salary_id WHERE h.job_title = ? AND h.city = ? '
+            f'ORDER BY h.valid_from, h.id',
+            (job_title, city)
+        ).fetchall()
+        return [(valid_from, SalaryRecord(*values)) for valid_from, *values in rows]
+
+    def aliases(self, job_title: str) -> list[str]:
+        """Return the search keywords that resolved to the page of a job title."""
+        return [alias for alias, in self.conn.execute(
+            'SELECT a.alias FROM title_aliases a JOIN job_titles t ON t.id = a.title_id WHERE t.name = ? '
+            'ORDER BY a.alias', (job_title,))]
+
+    def summary(self) -> dict:
+        row = self.conn.execute('SELECT COUNT(*), SUM(checks), SUM(changes) FROM crawl_units').fetchone()
+        return {"units": row[0], "checks": row[1] or 0, "changes": row[2] or 0}
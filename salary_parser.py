@@ -0,0 +1,110 @@
+import json
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from salary_record import SalaryRecord
+
+LD_JSON_TYPE = b'application/ld+json'
+OCCUPATION_PATTERN = re.compile(rb'Occupation', re.IGNORECASE)
+
+
+def iter_ld_json_blocks(page: bytes):
+    """
+    Yield the raw contents of every `<script type="application/ld+json">` block.
+
+    The page is scanned with plain byte searches instead of being parsed into a
+    DOM, which is far cheaper on large pages where the JSON-LD is all we need.
+    """
+    pos = 0
+    while True:
+        type_at = page.find(LD_JSON_TYPE, pos)
+        if type_at == -1:
+            return
+
+        tag_start = page.rfind(b'<', 0, type_at)
+        tag_end = page.find(b'>', type_at)
+        if tag_start == -1 or tag_end == -1 or not page.startswith(b'<script', tag_start):
+            pos = type_at + len(LD_JSON_TYPE)
+            continue
+
+        close_at = page.find(b'</script', tag_end)
+        if close_at == -1:
+            return
+
+        yield page[tag_end + 1:close_at]
+        pos = close_at
+
+
+def find_occupation_json(page: bytes) -> dict | None:
+    """Return the decoded Occupation JSON-LD object of a page, or None if the fast scan finds none."""
+    for block in iter_ld_json_blocks(page):
+        if OCCUPATION_PATTERN.search(block):
+            try:
+                return json.loads(block)
+            except ValueError:
+                return None
+    return None
+
+
+def find_occupation_json_bs(page: bytes | str) -> dict | None:
+    """Locate the Occupation JSON-LD object with BeautifulSoup; slower but tolerant of unusual markup."""
+    soup = BeautifulSoup(page, 'html.parser')
+    pattern = re.compile(r'Occupation', re.IGNORECASE)
+    script = soup.find('script', {'type': 'application/ld+json'}, string=pattern)
+
+    if not script:
+        print("Error: Could not find the script tag containing salary data.")
+        return None
+
+    # Parse the JSON data
+    json_raw = script.contents[0]
+    return json.loads(json_raw)
+
+
+def parse_salary_page(page: bytes | str) -> SalaryRecord | None:
+    """
+    Parse a Salary.com salary page into a SalaryRecord.
+
+    The page embeds its salary estimate in a `<script type="application/ld+json">`
+    block describing an "Occupation". That block is located by scanning the raw
+    bytes; BeautifulSoup is only used when the scan comes up empty.
+
+    Args:
+        page (bytes | str): The raw response body (preferred) or decoded HTML of the salary page.
+
+    Returns:
+        SalaryRecord: The job title, location, description and salary percentiles,
+        or None if data cannot be extracted.
+    """
+    try:
+        raw = page.encode('utf-8') if isinstance(page, str) else page
+        json_data = find_occupation_json(raw)
+        if json_data is None:
+            json_data = find_occupation_json_bs(page)
+            if json_data is None:
+                return None
+
+        return SalaryRecord.from_json_ld(json_data)
+
+    except json.JSONDecodeError:
+        print("Error: Failed to decode JSON from the script tag.")
+    except KeyError as e:
+        print(f"Error: Missing key in JSON data - {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    return None
+
+
+def timed_parse(page: bytes | str) -> tuple[SalaryRecord | None, float]:
+    """
+    Parse a salary page and also return the seconds it took.
+
+    Used by parser processes: the time is measured where the parsing happens and
+    recorded by the caller, whose metrics are the ones that get reported.
+    """
+    start_time = time.perf_counter()
+    record = parse_salary_page(page)
+    return record, time.perf_counter() - start_time
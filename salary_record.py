@@ -0,0 +1,106 @@
+import math
+import sys
+
+TEXT_FIELDS = ("job_title", "job_location", "job_description")
+PERCENTILE_FIELDS = ("nTile10", "nTile25", "nTile50", "nTile75", "nTile90")
+NAN = float("nan")
+
+
+def to_number(value) -> float:
+    """Coerce a scraped percentile to a float; anything that is not a number ('N/A', '', None) becomes NaN."""
+    if isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def intern_text(value) -> str | None:
+    """Intern a text field, so the same title, location or description is stored once however many rows use it."""
+    return None if value is None else sys.intern(str(value))
+
+
+class SalaryRecord:
+    """
+    One salary row: job title, location, description and five salary percentiles.
+
+    Percentiles are always floats, with NaN where the page had no value, and the
+    text fields are interned. The record iterates, indexes and unpacks like the
+    (job_title, location, description, ntile_10, ..., ntile_90) tuple it
+    replaces, and converts straight to the form each writer needs: `csv_row()`,
+    `sqlite_params()`, `to_json()` and `columns()` for Arrow.
+    """
+
+    __slots__ = TEXT_FIELDS + PERCENTILE_FIELDS
+    fields = TEXT_FIELDS + PERCENTILE_FIELDS
+
+    def __init__(self, job_title, job_location, job_description, nTile10=NAN, nTile25=NAN, nTile50=NAN, nTile75=NAN,
+                 nTile90=NAN):
+        self.job_title = intern_text(job_title)
+        self.job_location = intern_text(job_location)
+        self.job_description = intern_text(job_description)
+        self.nTile10 = to_number(nTile10)
+        self.nTile25 = to_number(nTile25)
+        self.nTile50 = to_number(nTile50)
+        self.nTile75 = to_number(nTile75)
+        self.nTile90 = to_number(nTile90)
+
+    @classmethod
+    def from_json_ld(cls, json_data: dict) -> "SalaryRecord":
+        """Build a record from a Salary.com "Occupation" JSON-LD object."""
+        location = json_data.get('occupationLocation', [{}])[0].get('name')
+        salary_data = json_data.get('estimatedSalary', [{}])[0]
+        return cls(json_data.get('name'), location, json_data.get('description'),
+                   salary_data.get('percentile10'), salary_data.get('percentile25'), salary_data.get('median'),
+                   salary_data.get('percentile75'), salary_data.get('percentile90'))
+
+    def as_tuple(self) -> tuple:
+        return (self.job_title, self.job_location, self.job_description, self.nTile10, self.nTile25, self.nTile50,
+                self.nTile75, self.nTile90)
+
+    def sqlite_params(self) -> tuple:
+        """The record as statement parameters, NaN percentiles as None (NULL); also what JSON and Excel need."""
+        return (self.job_title, self.job_location, self.job_description,
+                *(None if math.isnan(value) else value for value in
+                  (self.nTile10, self.nTile25, self.nTile50, self.nTile75, self.nTile90)))
+
+    def csv_row(self) -> tuple:
+        """The record as a CSV row, NaN percentiles as empty cells."""
+        return (self.job_title, self.job_location, self.job_description,
+                *("" if math.isnan(value) else value for value in
+                  (self.nTile10, self.nTile25, self.nTile50, self.nTile75, self.nTile90)))
+
+    def to_json(self, headers=None) -> dict:
+        """The record as a JSON-ready dict keyed by `headers` (default: the field names)."""
+        return dict(zip(headers or self.fields, self.sqlite_params()))
+
+    @classmethod
+    def columns(cls, records: list) -> list[list]:
+        """Transpose records into one list per field, ready for `pyarrow.array(..., from_pandas=True)`."""
+        return [[getattr(record, field) for record in records] for field in cls.fields]
+
+    def __iter__(self):
+        return iter(self.as_tuple())
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, SalaryRecord):
+            return NotImplemented
+        return self.sqlite_params() == other.sqlite_params()
+
+    def __hash__(self):
+        return hash(self.sqlite_params())
+
+    def __reduce__(self):
+        # Pickle as the plain field values, e.g. when returned from a parser process
+        return SalaryRecord, self.as_tuple()
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.fields)
+        return f"SalaryRecord({values})"
@@ -0,0 +1,207 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from salary_record import PERCENTILE_FIELDS
+from store_data import LATEST_SALARY_FACT, is_normalized_db, read_data_version
+
+VERSION_CHECK_INTERVAL = 1.0
+SNAPSHOT_COLUMNS = ["id", "job_title", "job_location", "job_description", *PERCENTILE_FIELDS, "scrape_date"]
+
+
+def lookup_table(conn: sqlite3.Connection, query: str) -> tuple[np.ndarray, np.ndarray]:
+    """Read an (id, text) lookup table into sorted ids and an object array of texts, with None appended for -1."""
+    rows = conn.execute(query).fetchall()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    texts = np.empty(len(rows) + 1, dtype=object)
+    texts[:-1] = [row[1] for row in rows]
+    return ids, texts
+
+
+def encode(keys: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Map foreign keys to positions in a sorted id array; NULL (-1) and dangling keys become -1."""
+    positions = np.searchsorted(ids, keys).clip(max=max(len(ids) - 1, 0))
+    found = ids[positions] == keys if len(ids) else np.zeros(len(keys), dtype=bool)
+    return np.where(found, positions, -1).astype(np.int32)
+
+
+def nullable(values: np.ndarray) -> np.ndarray:
+    """Turn the NaNs of a float array back into None, as SQLite returns NULL."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    values = values.astype(object)
+    values[missing] = None
+    return values
+
+
+class SalarySnapshot:
+    """
+    Read-only, columnar copy of the `salary_latest` view for the API's analytical queries.
+
+    Titles, locations and descriptions are int32 codes into arrays of their
+    texts, percentiles are float64 arrays with NaN for NULL. Orderings the
+    routes need are computed once at load time: rows sorted by median (then id)
+    make a salary range two binary searches and a slice, and rows sorted by
+    spread (nTile90 - nTile10, descending, NULL last) make the top-k growth
+    ranking a slice. Only the returned rows are turned back into Python objects.
+
+    Snapshots are never modified after `load()`; a newer data version gets a new one.
+    """
+
+    def __init__(self, version: int, ids: np.ndarray, title_codes: np.ndarray, titles: np.ndarray,
+                 location_codes: np.ndarray, locations: np.ndarray, description_codes: np.ndarray,
+                 descriptions: np.ndarray, percentiles: dict, scrape_dates: np.ndarray):
+        self.version = version
+        self.ids = ids
+        self.title_codes = title_codes
+        self.titles = titles
+        self.location_codes = location_codes
+        self.locations = locations
+        self.description_codes = description_codes
+        self.descriptions = descriptions
+        self.percentiles = percentiles
+        self.scrape_dates = scrape_dates
+
+        median = percentiles["nTile50"]
+        self.median_order = np.lexsort((ids, median))  # NaN sorts last
+        self.sorted_median = median[self.median_order]
+        self.growth = percentiles["nTile90"] - percentiles["nTile10"]
+        self.growth_order = np.lexsort((ids, -np.nan_to_num(self.growth, nan=-np.inf)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "SalarySnapshot":
+        """
+        Read the normalized salary tables into a snapshot, in one read transaction.
+
+        Only the latest scrape of every title and location is loaded, like the
+        SQL routes and the `top_paying` index see it. The data version is read in
+        the same transaction, so it describes exactly the rows loaded even while
+        the scraper keeps writing.
+
+        Raises:
+            ValueError: If the database does not use the normalized schema.
+            sqlite3.Error: If the tables cannot be read.
+        """
+        in_transaction = conn.in_transaction
+        if not in_transaction:
+            conn.execute("BEGIN")
+        try:
+            if not is_normalized_db(conn):
+                raise ValueError("snapshots need the normalized salary schema")
+            version = read_data_version(conn)
+            title_ids, titles = lookup_table(conn, "SELECT id, name FROM job_titles ORDER BY id")
+            location_ids, locations = lookup_table(conn, "SELECT id, name FROM locations ORDER BY id")
+            description_ids, descriptions = lookup_table(conn, "SELECT id, text FROM descriptions ORDER BY id")
+            rows = conn.execute(
+                f'SELECT id, IFNULL(title_id, -1), IFNULL(location_id, -1), IFNULL(description_id, -1), '
+                f'{", ".join(PERCENTILE_FIELDS)}, scrape_date FROM salary_facts f '
+                f'WHERE {LATEST_SALARY_FACT} ORDER BY id'
+            ).fetchall()
+        finally:
+            if not in_transaction:
+                conn.rollback()
+
+        columns = list(zip(*rows)) if rows else [()] * len(SNAPSHOT_COLUMNS)
+        percentiles = {field: np.array(values, dtype=np.float64)
+                       for field, values in zip(PERCENTILE_FIELDS, columns[4:9])}
+        return cls(
+            version,
+            np.array(columns[0], dtype=np.int64),
+            encode(np.array(columns[1], dtype=np.int64), title_ids), titles,
+            encode(np.array(columns[2], dtype=np.int64), location_ids), locations,
+            encode(np.array(columns[3], dtype=np.int64), description_ids), descriptions,
+            percentiles,
+            np.array(columns[9], dtype=object),
+        )
+
+    def rows(self, indices: np.ndarray, columns: list = None) -> list[dict]:
+        """Materialize the rows at `indices` as dicts of `columns` (default: every column of the `salary` view)."""
+        columns = columns or SNAPSHOT_COLUMNS
+        values = []
+        for column in columns:
+            if column == "id":
+                values.append(self.ids[indices].tolist())
+            elif column == "job_title":
+                values.append(self.titles[self.title_codes[indices]].tolist())
+            elif column == "job_location":
+                values.append(self.locations[self.location_codes[indices]].tolist())
+            elif column == "job_description":
+                values.append(self.descriptions[self.description_codes[indices]].tolist())
+            elif column == "scrape_date":
+                values.append(self.scrape_dates[indices].tolist())
+            elif column == "salary_growth":
+                values.append(nullable(self.growth[indices]).tolist())
+            else:
+                values.append(nullable(self.percentiles[column][indices]).tolist())
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def salary_range(self, min_salary: float, max_salary: float) -> np.ndarray:
+        """Indices of the rows whose median lies in [min_salary, max_salary], by median then id like the SQL index scan."""
+        if np.isnan(min_salary) or np.isnan(max_salary):
+            return self.median_order[:0]
+        start = np.searchsorted(self.sorted_median, min_salary, side="left")
+        stop = np.searchsorted(self.sorted_median, max_salary, side="right")
+        return self.median_order[start:max(start, stop)]
+
+    def high_growth(self, limit: int = 10) -> np.ndarray:
+        """Indices of the `limit` rows with the widest nTile10-nTile90 spread, rows missing either last."""
+        return self.growth_order[:limit]
+
+
+class SnapshotHolder:
+    """
+    Keeps the current SalarySnapshot of an API process and reloads it when the data version changes.
+
+    The version is checked at most once per `version_interval` seconds. One
+    thread reloads while the others keep answering from the snapshot they
+    have; the new snapshot replaces the old one in a single assignment, so a
+    request sees either the old or the new data, never a mix. Queries never
+    touch SQLite, so they do not compete with the scraper for the database.
+
+    Args:
+        version_source (callable): Returns the current data version.
+        loader (callable): Returns a freshly loaded SalarySnapshot.
+        version_interval (float): Seconds between data version checks (default: 1.0).
+    """
+
+    def __init__(self, version_source, loader, version_interval: float = VERSION_CHECK_INTERVAL):
+        self.version_source = version_source
+        self.loader = loader
+        self.version_interval = version_interval
+        self.snapshot = None
+        self.version_checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> SalarySnapshot | None:
+        """Return an up-to-date snapshot, or None if none could be loaded (callers then query SQLite)."""
+        snapshot = self.snapshot
+        now = time.monotonic()
+        if now - self.version_checked_at < self.version_interval:
+            return snapshot
+        self.version_checked_at = now
+        if snapshot is not None and self.version_source() == snapshot.version:
+            return snapshot
+
+        # While another thread reloads, answer from the snapshot we have; wait only if there is none
+        if not self.lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self.snapshot is not snapshot:
+                return self.snapshot
+            try:
+                self.snapshot = self.loader()
+            except (sqlite3.Error, ValueError) as e:
+                print(f"Could not load the salary snapshot: {e}")
+            return self.snapshot
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.snapshot = None
+        self.version_checked_at = 0.0
@@ -1,39 +1,126 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
 import requests
 from bs4 import BeautifulSoup
 
+import http_client
+
+
+def site_of(url: str) -> str:
+    """Return the canonical scheme://host[:port] of a URL."""
+    parts = urlsplit(http_client.canonical_url(url))
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class SearchIndex:
+    """
+    Persistent index of (site, search keyword) -> ranked salary page links.
+
+    Every link found on a search result page is kept with its rank, so a job
+    title only ever needs to be searched once per site. Entries are keyed by the
+    site searched, so links found on a fixture server are never used for a crawl
+    of salary.com, and the other way round.
+    """
+
+    def __init__(self, db_name: str = "salary_results.db", table_name: str = "search_index",
+                 base_url: str = "https://www.salary.com"):
+        self.db_name = db_name
+        self.table_name = table_name
+        self.base_url = http_client.canonical_url(base_url)
+        with sqlite3.connect(db_name) as conn:
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+            if columns and "base_url" not in columns:
+                conn.execute(f'ALTER TABLE "{table_name}" RENAME TO "{table_name}_unkeyed"')
+            conn.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}" (
+                                base_url TEXT NOT NULL,
+                                keyword TEXT NOT NULL,
+                                rank INTEGER NOT NULL,
+                                url TEXT NOT NULL,
+                                resolved_at TEXT NOT NULL,
+                                PRIMARY KEY (base_url, keyword, rank)
+                                )''')
+            if columns and "base_url" not in columns:
+                # Entries from before the index was keyed by site belong to the site their links point to
+                rows = conn.execute(f'SELECT keyword, rank, url, resolved_at FROM "{table_name}_unkeyed"').fetchall()
+                conn.executemany(
+                    f'INSERT OR IGNORE INTO "{table_name}" (base_url, keyword, rank, url, resolved_at) '
+                    f'VALUES (?, ?, ?, ?, ?)',
+                    [(site_of(url), keyword, rank, url, resolved_at) for keyword, rank, url, resolved_at in rows]
+                )
+                conn.execute(f'DROP TABLE "{table_name}_unkeyed"')
+
+    @staticmethod
+    def normalize(keyword: str) -> str:
+        return " ".join(keyword.lower().split())
+
+    def get(self, keyword: str) -> list[str] | None:
+        """Return the ranked links stored for a keyword on this site, or None if it was never resolved."""
+        with sqlite3.connect(self.db_name) as conn:
+            rows = conn.execute(f'SELECT url FROM "{self.table_name}" WHERE base_url = ? AND keyword = ? ORDER BY rank',
+                                (self.base_url, self.normalize(keyword))).fetchall()
+        return list(dict.fromkeys(http_client.canonical_url(url) for url, in rows)) or None
+
+    def put(self, keyword: str, links: list[str]):
+        keyword = self.normalize(keyword)
+        resolved_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with sqlite3.connect(self.db_name) as conn:
+            conn.execute(f'DELETE FROM "{self.table_name}" WHERE base_url = ? AND keyword = ?',
+                         (self.base_url, keyword))
+            conn.executemany(
+                f'INSERT INTO "{self.table_name}" (base_url, keyword, rank, url, resolved_at) VALUES (?, ?, ?, ?, ?)',
+                [(self.base_url, keyword, rank, url, resolved_at) for rank, url in enumerate(links)]
+            )
+
 
 class SearchResult:
-    def __init__(self):
-        self.url = "https://www.salary.com/research/search?type=job&page=1&keyword={}"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        self.base_url = "https://www.salary.com"
+    def __init__(self, base_url: str = "https://www.salary.com", index_db: str | None = "salary_results.db"):
+        self.url = f"{base_url}/research/search?type=job&page=1&keyword={{}}"
+        self.base_url = base_url
+        self.index = SearchIndex(index_db, base_url=base_url) if index_db else None
         self.first_link = None
+        self.links = []
+
+    def search(self, keyword: str) -> list[str]:
+        """
+        Fetch the search result page for a keyword and return every salary page link on it, in rank order.
+
+        Links are canonicalized (see `http_client.canonical_url()`) and listed once each.
+        """
+        formated_url = self.url.format(keyword.replace(" ", "%20"))
+        response = http_client.get(formated_url)
+        soup = BeautifulSoup(response.text, "html.parser")
+        a_tag = soup.find_all("div", {"class": "margin-bottom5 font-semibold"})
+        links = [http_client.canonical_url(f"{self.base_url}{href.find('a').get('href')}") for href in a_tag if a_tag]
+        return list(dict.fromkeys(links))
 
-    def scrape_url_structure(self, keyword: str):
+    def scrape_url_structure(self, keyword: str, refresh: bool = False):
         """
             Scrapes URLs based on the provided keyword.
 
             This method constructs a formatted URL by replacing spaces in the keyword with "%20".
             It then sends an HTTP GET request to fetch the page's HTML content. Using BeautifulSoup,
-            it parses the HTML and searches for specific "div" elements containing job links. The URLs
-            found are appended to a list, and the top five links are stored in the `self.top_five_link` attribute.
+            it parses the HTML and searches for specific "div" elements containing job links. All
+            links found are kept in `self.links` (and the search index), the top one in `self.first_link`.
+            Keywords already in the search index are answered without any request.
 
             Args:
             - keyword (str): The search term or keyword to include in the URL query.
+            - refresh (bool): Search again even if the keyword is in the index.
 
             Returns:
-            - list: A list of all scraped URLs, or an empty list if an error occurs.
+            - SearchResult: self, or an empty list if an error occurs.
 
             """
         try:
-            formated_url = self.url.format(keyword.replace(" ", "%20"))
-            response = requests.get(formated_url, self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            a_tag = soup.find_all("div", {"class": "margin-bottom5 font-semibold"})
-            hrefs = [f"{self.base_url}{href.find("a").get("href")}" for href in a_tag if a_tag]
+            hrefs = self.index.get(keyword) if self.index and not refresh else None
+            if hrefs is None:
+                hrefs = self.search(keyword)
+                if self.index and hrefs:
+                    self.index.put(keyword, hrefs)
+            self.links = hrefs
             self.first_link = hrefs[0]
 
             return self
@@ -48,3 +135,43 @@ class SearchResult:
             # Return an empty list in case of failure
         self.first_link = []
         return []
+
+    def resolve_many(self, keywords: list[str], max_workers: int = 8, refresh: bool = False) -> dict:
+        """
+        Resolve many keywords to their ranked salary page links.
+
+        Keywords found in the search index are answered without touching the
+        network; the rest are searched concurrently on a thread pool and added
+        to the index.
+
+        Args:
+            keywords (list): The search terms to resolve (e.g., job titles).
+            max_workers (int): Maximum number of concurrent searches (default: 8).
+            refresh (bool): Search every keyword again even if it is in the index.
+
+        Returns:
+            dict: Maps each keyword to its list of links, or to None if it could not be resolved.
+        """
+        resolved = {}
+        for keyword in keywords:
+            resolved[keyword] = self.index.get(keyword) if self.index and not refresh else None
+
+        def search(keyword):
+            try:
+                return keyword, self.search(keyword) or None
+            except requests.exceptions.RequestException as e:
+                print(f"HTTP error occurred while searching '{keyword}': {e}")
+            except Exception as e:
+                print(f"An error occurred while searching '{keyword}': {e}")
+            return keyword, None
+
+        missing = [keyword for keyword, links in resolved.items() if links is None]
+        if missing:
+            print(f"Resolving {len(missing)} of {len(resolved)} job titles via search...")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for keyword, links in executor.map(search, missing):
+                    resolved[keyword] = links
+                    if self.index and links:
+                        self.index.put(keyword, links)
+
+        return resolved
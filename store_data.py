@@ -1,7 +1,302 @@
 import csv
 import json
+import math
 import sqlite3
-import pandas as pd
+import textwrap
+from contextlib import closing
+from datetime import datetime, timezone
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from metrics import WRITE_SECONDS, WRITTEN_ROWS
+from salary_record import SalaryRecord, to_number
+
+
+class Sink:
+    """
+    Base class of the streaming writers.
+
+    A sink is opened once, receives records one at a time through `write()` and
+    is closed at the end, so no writer ever needs the whole dataset in memory.
+    Sinks are context managers, and `write_stream()` feeds one iterator to
+    several of them at once.
+    """
+
+    def __init__(self, file_path: str, headers: list):
+        self.file_path = file_path
+        self.headers = headers
+
+    def open(self):
+        pass
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def plain_values(record) -> tuple:
+    """A record's values with missing percentiles as None, for writers that cannot store NaN (JSON, Excel)."""
+    return record.sqlite_params() if isinstance(record, SalaryRecord) else record
+
+
+class CsvSink(Sink):
+    def __init__(self, file_path: str, headers: list):
+        if not file_path.endswith(".csv"):
+            file_path += ".csv"
+        super().__init__(file_path, headers)
+        self.file = None
+        self.writer = None
+
+    def open(self):
+        self.file = open(self.file_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.headers)
+
+    def write(self, record):
+        self.writer.writerow(record.csv_row() if isinstance(record, SalaryRecord) else record)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class JsonArraySink(Sink):
+    """Streams records as a pretty-printed JSON array of objects, identical to `json.dump(..., indent=4)`."""
+
+    def __init__(self, file_path: str, headers: list):
+        if not file_path.endswith(".json"):
+            file_path += ".json"
+        super().__init__(file_path, headers)
+        self.file = None
+        self.count = 0
+
+    def open(self):
+        self.file = open(self.file_path, 'w', encoding='utf-8')
+        self.file.write("[")
+
+    def write(self, record):
+        item = json.dumps(dict(zip(self.headers, plain_values(record))), indent=4, ensure_ascii=False)
+        self.file.write(",\n" if self.count else "\n")
+        self.file.write(textwrap.indent(item, "    "))
+        self.count += 1
+
+    def close(self):
+        if self.file:
+            self.file.write("\n]" if self.count else "]")
+            self.file.close()
+
+
+class JsonLinesSink(Sink):
+    """Streams records as JSON Lines: one compact JSON object per line."""
+
+    def __init__(self, file_path: str, headers: list):
+        if not file_path.endswith(".jsonl"):
+            file_path += ".jsonl"
+        super().__init__(file_path, headers)
+        self.file = None
+
+    def open(self):
+        self.file = open(self.file_path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(dict(zip(self.headers, plain_values(record))), ensure_ascii=False))
+        self.file.write("\n")
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class ExcelSink(Sink):
+    """Streams records into an Excel workbook using openpyxl's write-only mode."""
+
+    def __init__(self, file_path: str, headers: list, sheet_name: str = "Sheet1"):
+        if not file_path.endswith(".xlsx"):
+            file_path += ".xlsx"
+        super().__init__(file_path, headers)
+        self.sheet_name = sheet_name
+        self.workbook = None
+        self.sheet = None
+
+    def open(self):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(self.sheet_name)
+        self.sheet.append(self.headers)
+
+    def write(self, record):
+        self.sheet.append(list(plain_values(record)))
+
+    def close(self):
+        if self.workbook:
+            self.workbook.save(self.file_path)
+            self.workbook.close()
+
+
+class SqliteSink(Sink):
+    """
+    Streams records into an existing SQLite table, committing every `batch_size` rows.
+
+    Rows written to the `salary` view of a normalized database also refresh the
+    `top_paying` index of their locations, in the same transaction.
+    """
+
+    def __init__(self, db_name: str, table_name: str, columns_names: list, batch_size: int = 1000):
+        if not db_name.endswith(".db"):
+            db_name = db_name.replace(" ", "_") + ".db"
+        super().__init__(db_name, columns_names)
+        self.table_name = table_name.replace(' ', '_')
+        self.batch_size = batch_size
+        self.conn = None
+        self.batch = []
+        self.ranked = False
+
+    def open(self):
+        self.conn = sqlite3.connect(self.file_path)
+        self.ranked = (self.table_name == "salary" and "job_location" in self.headers
+                       and is_normalized_db(self.conn) and has_top_paying_index(self.conn))
+
+    def write(self, record):
+        self.batch.append(tuple(plain_values(record)))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        col_names = ", ".join(self.headers)
+        placeholders = ", ".join(["?" for _ in self.headers])
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.executemany(f"INSERT INTO '{self.table_name}' ({col_names}) VALUES ({placeholders})", self.batch)
+            if self.ranked:
+                column = self.headers.index("job_location")
+                refresh_top_paying(cursor, location_ids(cursor, {row[column] for row in self.batch}))
+            bump_data_version(cursor)
+        self.batch = []
+
+    def close(self):
+        if self.conn:
+            self.flush()
+            self.conn.close()
+
+
+PERCENTILE_COLUMNS = ['nTile10', 'nTile25', 'nTile50', 'nTile75', 'nTile90']
+
+
+def arrow_schema(headers: list, float_columns: list = None) -> pa.Schema:
+    """
+    Build the Arrow schema used for columnar exports.
+
+    Percentile columns are typed float64; every other column is a dictionary
+    encoded string, so repeated titles, locations and descriptions are stored
+    once per row group instead of once per row.
+    """
+    float_columns = PERCENTILE_COLUMNS if float_columns is None else float_columns
+    return pa.schema([
+        pa.field(name, pa.float64() if name in float_columns else pa.dictionary(pa.int32(), pa.string()))
+        for name in headers
+    ])
+
+
+def rows_to_arrow(rows: list, schema: pa.Schema) -> pa.Table:
+    """Convert a batch of row tuples into an Arrow table with the given schema."""
+    records = rows and isinstance(rows[0], SalaryRecord) and len(schema) == len(SalaryRecord.fields)
+    if records:
+        # Percentiles are already floats; from_pandas turns their NaNs into nulls
+        columns = SalaryRecord.columns(rows)
+    else:
+        columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_floating(field.type) and records:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        elif pa.types.is_floating(field.type):
+            arrays.append(pa.array([to_number(value) for value in values], type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ParquetSink(Sink):
+    """Streams records into a Parquet file, one row group per `row_group_size` rows."""
+
+    def __init__(self, file_path: str, headers: list, float_columns: list = None, row_group_size: int = 50000,
+                 compression: str = "zstd"):
+        if not file_path.endswith(".parquet"):
+            file_path += ".parquet"
+        super().__init__(file_path, headers)
+        self.schema = arrow_schema(headers, float_columns)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.writer = None
+        self.batch = []
+
+    def open(self):
+        self.writer = pq.ParquetWriter(self.file_path, self.schema, compression=self.compression,
+                                       use_dictionary=True)
+
+    def write(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.writer.write_table(rows_to_arrow(self.batch, self.schema))
+            self.batch = []
+
+    def close(self):
+        if self.writer:
+            self.flush()
+            self.writer.close()
+
+
+def write_stream(records, sinks: list) -> bool:
+    """
+    Write an iterator of records to several sinks in a single pass.
+
+    Args:
+        records (iterable): Rows (tuples or lists) to write; consumed lazily.
+        sinks (list): The `Sink` instances to write every row to.
+
+    Returns:
+        bool: True if every sink was written successfully, False otherwise.
+    """
+    opened = []
+    current = None
+    try:
+        for current in sinks:
+            current.open()
+            opened.append(current)
+        for record in records:
+            for current in sinks:
+                current.write(record)
+        while opened:
+            current = opened.pop(0)
+            current.close()
+            print(f"Results saved to '{current.file_path}'.")
+        return True
+
+    except Exception as e:
+        print(f"Error writing to file '{current.file_path if current else ''}': {e}")
+        for sink in opened:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        return False
 
 
 def save_to_excel(file_path, data, headers):
@@ -10,22 +305,13 @@ def save_to_excel(file_path, data, headers):
 
     Args:
         file_path (str): Path to the output Excel file.
-        data (list): A list of rows (tuples or lists) to save.
+        data (iterable): Rows (tuples or lists) to save.
         headers (list): A list of column headers for the Excel file.
 
     Returns:
         bool: True if the file was saved successfully, False otherwise.
     """
-    if not file_path.endswith(".xlsx"):
-        file_path += ".xlsx"
-    try:
-        df = pd.DataFrame(data, columns=headers)
-        df.to_excel(file_path, index=False, engine='openpyxl')
-        print(f"Results saved to '{file_path}'.")
-        return True
-    except Exception as e:
-        print(f"Error writing to file '{file_path}': {e}")
-        return False
+    return write_stream(data, [ExcelSink(file_path, headers)])
 
 
 def save_to_csv(file_path, data, headers):
@@ -34,24 +320,13 @@ def save_to_csv(file_path, data, headers):
 
     Args:
         file_path (str): Path to the output CSV file.
-        data (list): A list of rows (tuples or lists) to save.
+        data (iterable): Rows (tuples or lists) to save.
         headers (list): A list of column headers for the CSV file.
 
     Returns:
         bool: True if the file was saved successfully, False otherwise.
     """
-    if not file_path.endswith(".csv"):
-        file_path += ".csv"
-    try:
-        with open(file_path, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(headers)
-            writer.writerows(data)
-        print(f"Results saved to '{file_path}'.")
-        return True
-    except Exception as e:
-        print(f"Error writing to file '{file_path}': {e}")
-        return False
+    return write_stream(data, [CsvSink(file_path, headers)])
 
 
 def save_to_json(file_path, data, headers):
@@ -60,25 +335,52 @@ def save_to_json(file_path, data, headers):
 
     Args:
         file_path (str): Path to the output JSON file.
-        data (list): A list of rows (tuples or lists) to save.
+        data (iterable): Rows (tuples or lists) to save.
         headers (list): A list of column headers for the JSON file.
 
     Returns:
         bool: True if the file was saved successfully, False otherwise.
     """
-    if not file_path.endswith(".json"):
-        file_path += ".json"
+    return write_stream(data, [JsonArraySink(file_path, headers)])
+
+
+def save_to_parquet(file_path, data, headers):
+    """
+    Save data to a Parquet file.
+
+    Args:
+        file_path (str): Path to the output Parquet file.
+        data (iterable): Rows (tuples or lists) to save.
+        headers (list): A list of column headers for the Parquet file.
+
+    Returns:
+        bool: True if the file was saved successfully, False otherwise.
+    """
+    return write_stream(data, [ParquetSink(file_path, headers)])
+
+
+def read_parquet(file_path, columns: list = None, filters=None) -> pa.Table | None:
+    """
+    Load a Parquet file written by `save_to_parquet()` as an Arrow table.
+
+    The file is memory-mapped and only the requested columns are read, so
+    loading the percentiles alone never touches the description pages.
+
+    Args:
+        file_path (str): Path to the Parquet file.
+        columns (list): Columns to load (default: all of them).
+        filters: Optional pyarrow row filters, e.g. [('nTile50', '>', 100000)].
+
+    Returns:
+        pyarrow.Table: The loaded table (`.to_pandas()` for a DataFrame), or None on error.
+    """
+    if not file_path.endswith(".parquet"):
+        file_path += ".parquet"
     try:
-        # Convert data to a list of dictionaries
-        json_data = [dict(zip(headers, row)) for row in data]
-        # Save the data to a JSON file
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(json_data, file, indent=4, ensure_ascii=False)
-        print(f"Results saved to '{file_path}'.")
-        return True
+        return pq.read_table(file_path, columns=columns, filters=filters, memory_map=True)
     except Exception as e:
-        print(f"Error writing to file '{file_path}': {e}")
-        return False
+        print(f"Error reading file '{file_path}': {e}")
+        return None
 
 
 def create_db(db_name: str = "salary_results.db", table_name="salary", columns: dict = None):
@@ -130,6 +432,9 @@ def insert_records(db_name: str, table_name, columns_names: list, records: list[
     """
     Insert a list of tuples into the specified database table.
 
+    Rows for the `salary` view of a normalized database go through `bulk_ingest()`,
+    so they are coerced and upserted instead of appended.
+
     Parameters:
     - db_name: Name of the database file.
     - table_name: Name of the table where records will be inserted.
@@ -142,13 +447,562 @@ def insert_records(db_name: str, table_name, columns_names: list, records: list[
     table_name = table_name.replace(' ', '_')
 
     try:
+        with sqlite3.connect(db_name) as conn:
+            normalized = table_name == "salary" and list(columns_names) == SALARY_COLUMNS and is_normalized_db(conn)
+        if normalized:
+            bulk_ingest(db_name, records)
+            return
+
         with sqlite3.connect(db_name) as conn:
             cursor = conn.cursor()
             col_names = ", ".join(columns_names)
             placeholders = ", ".join(["?" for value in columns_names])
             query = f"INSERT INTO '{table_name}' ({col_names}) VALUES ({placeholders})"
             cursor.executemany(query, records)
+            bump_data_version(cursor)
             conn.commit()
 
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
+
+
+def bump_data_version(cursor: sqlite3.Cursor) -> int:
+    """
+    Increment the database's data version inside the caller's transaction and return it.
+
+    Every writer of salary rows calls this, so readers such as the API's response
+    cache can tell whether anything changed by comparing a single integer.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    cursor.execute("INSERT INTO meta (key, value) VALUES ('data_version', 1) "
+                   "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+    return cursor.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+
+def read_data_version(conn: sqlite3.Connection) -> int:
+    """Return the database's data version, 0 if it was never written through `bump_data_version()`."""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+SALARY_COLUMNS = ["job_title", "job_location", "job_description"] + PERCENTILE_COLUMNS
+
+# Every writer of salary_facts (the view's trigger, single-row and batch upserts) shares these: one row per title,
+# location and scrape date, a repeated scrape overwriting the description and percentiles
+SALARY_FACT_COLUMNS = ["title_id", "location_id", "description_id"] + PERCENTILE_COLUMNS + ["scrape_date"]
+UPSERT_SALARY_FACT_CONFLICT = "ON CONFLICT (title_id, location_id, scrape_date) DO UPDATE SET " + ", ".join(
+    f"{column} = excluded.{column}" for column in ["description_id"] + PERCENTILE_COLUMNS)
+
+# A fact is the latest scrape of its title and location unless a newer one exists. Undated rows (loaded before
+# scrape dates were recorded) are older than any dated one, and the highest id wins between equal dates.
+LATEST_SALARY_FACT = '''NOT EXISTS (
+    SELECT 1 FROM salary_facts newer
+    WHERE newer.title_id IS f.title_id AND newer.location_id IS f.location_id
+      AND (newer.scrape_date > f.scrape_date OR (f.scrape_date IS NULL AND newer.scrape_date IS NOT NULL)
+           OR (newer.scrape_date IS f.scrape_date AND newer.id > f.id))
+)'''
+SALARY_LATEST_QUERY = f"SELECT s.* FROM salary s JOIN salary_facts f ON f.id = s.id WHERE {LATEST_SALARY_FACT}"
+
+NORMALIZED_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS job_titles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS descriptions (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS salary_facts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title_id INTEGER REFERENCES job_titles (id),
+    location_id INTEGER REFERENCES locations (id),
+    description_id INTEGER REFERENCES descriptions (id),
+    nTile10 REAL,
+    nTile25 REAL,
+    nTile50 REAL,
+    nTile75 REAL,
+    nTile90 REAL,
+    scrape_date TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_salary_facts_key ON salary_facts (title_id, location_id, scrape_date);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_title ON salary_facts (title_id, location_id);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_location ON salary_facts (location_id, nTile90);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_ntile10 ON salary_facts (nTile10);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_ntile25 ON salary_facts (nTile25);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_ntile50 ON salary_facts (nTile50);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_ntile75 ON salary_facts (nTile75);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_ntile90 ON salary_facts (nTile90);
+
+CREATE TABLE IF NOT EXISTS top_paying (
+    location_id INTEGER NOT NULL,
+    percentile TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    salary_id INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (location_id, percentile, rank)
+) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS salary AS
+SELECT f.id, t.name AS job_title, l.name AS job_location, d.text AS job_description,
+       f.nTile10, f.nTile25, f.nTile50, f.nTile75, f.nTile90, f.scrape_date
+FROM salary_facts f
+LEFT JOIN job_titles t ON t.id = f.title_id
+LEFT JOIN locations l ON l.id = f.location_id
+LEFT JOIN descriptions d ON d.id = f.description_id;
+
+CREATE VIEW IF NOT EXISTS salary_latest AS
+{SALARY_LATEST_QUERY};
+
+CREATE TRIGGER IF NOT EXISTS salary_insert INSTEAD OF INSERT ON salary
+BEGIN
+    INSERT OR IGNORE INTO job_titles (name) SELECT NEW.job_title WHERE NEW.job_title IS NOT NULL;
+    INSERT OR IGNORE INTO locations (name) SELECT NEW.job_location WHERE NEW.job_location IS NOT NULL;
+    INSERT OR IGNORE INTO descriptions (text) SELECT NEW.job_description WHERE NEW.job_description IS NOT NULL;
+    INSERT INTO salary_facts ({", ".join(SALARY_FACT_COLUMNS)})
+    VALUES ((SELECT id FROM job_titles WHERE name = NEW.job_title),
+            (SELECT id FROM locations WHERE name = NEW.job_location),
+            (SELECT id FROM descriptions WHERE text = NEW.job_description),
+            {", ".join("NEW." + column for column in PERCENTILE_COLUMNS)}, COALESCE(NEW.scrape_date, date('now')))
+    {UPSERT_SALARY_FACT_CONFLICT};
+END;
+'''
+
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS salary_fts USING fts5 (
+    job_title, job_location, job_description,
+    content = 'salary', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS salary_fts_vocab USING fts5vocab (salary_fts, 'row');
+
+CREATE TRIGGER IF NOT EXISTS salary_facts_fts_insert AFTER INSERT ON salary_facts
+BEGIN
+    INSERT INTO salary_fts (rowid, job_title, job_location, job_description)
+    SELECT id, job_title, job_location, job_description FROM salary WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS salary_facts_fts_delete BEFORE DELETE ON salary_facts
+BEGIN
+    INSERT INTO salary_fts (salary_fts, rowid, job_title, job_location, job_description)
+    SELECT 'delete', id, job_title, job_location, job_description FROM salary WHERE id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS salary_facts_fts_update_old BEFORE UPDATE ON salary_facts
+BEGIN
+    INSERT INTO salary_fts (salary_fts, rowid, job_title, job_location, job_description)
+    SELECT 'delete', id, job_title, job_location, job_description FROM salary WHERE id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS salary_facts_fts_update_new AFTER UPDATE ON salary_facts
+BEGIN
+    INSERT INTO salary_fts (rowid, job_title, job_location, job_description)
+    SELECT id, job_title, job_location, job_description FROM salary WHERE id = NEW.id;
+END;
+'''
+
+MIGRATE_FLAT_SALARY = '''
+INSERT OR IGNORE INTO job_titles (name) SELECT DISTINCT job_title FROM salary_legacy WHERE job_title IS NOT NULL;
+INSERT OR IGNORE INTO locations (name) SELECT DISTINCT job_location FROM salary_legacy WHERE job_location IS NOT NULL;
+INSERT OR IGNORE INTO descriptions (text)
+    SELECT DISTINCT job_description FROM salary_legacy WHERE job_description IS NOT NULL;
+INSERT INTO salary_facts (id, title_id, location_id, description_id, nTile10, nTile25, nTile50, nTile75, nTile90)
+    SELECT s.id, t.id, l.id, d.id, s.nTile10, s.nTile25, s.nTile50, s.nTile75, s.nTile90
+    FROM salary_legacy s
+    LEFT JOIN job_titles t ON t.name = s.job_title
+    LEFT JOIN locations l ON l.name = s.job_location
+    LEFT JOIN descriptions d ON d.text = s.job_description
+    ORDER BY s.id;
+DROP TABLE salary_legacy;
+'''
+
+
+def is_normalized_db(conn: sqlite3.Connection) -> bool:
+    """Return True if the database uses the normalized salary schema."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'salary_facts'").fetchone()
+    return row is not None
+
+
+def migrate_to_normalized(db_name: str = "salary_results.db") -> bool:
+    """
+    Convert a database holding the flat `salary` table into the normalized schema.
+
+    Titles, locations and descriptions move into lookup tables and the salary
+    rows keep their ids, so anything referencing them stays valid. The whole
+    migration runs in a single transaction.
+
+    Parameters:
+    - db_name: Name of the database file (default: "salary_results.db").
+
+    Returns:
+    - bool: True if the database was migrated, False if there was nothing to migrate or an error occurred.
+    """
+    try:
+        with sqlite3.connect(db_name) as conn:
+            row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'salary'").fetchone()
+            if not row or row[0] != "table":
+                return False
+
+            conn.executescript(
+                "BEGIN; ALTER TABLE salary RENAME TO salary_legacy;"
+                f"{NORMALIZED_SCHEMA}{MIGRATE_FLAT_SALARY}COMMIT;"
+            )
+            count = conn.execute("SELECT COUNT(*) FROM salary_facts").fetchone()[0]
+            conn.execute("VACUUM")
+            print(f"Migrated {count} salary rows in '{db_name}' to the normalized schema.")
+            return True
+
+    except sqlite3.Error as err:
+        print(f"Error migrating database: {err}")
+        return False
+
+
+def upgrade_normalized_schema(conn: sqlite3.Connection):
+    """
+    Add the `scrape_date` column to a `salary_facts` table created before it existed.
+
+    The `salary` view is dropped so that `NORMALIZED_SCHEMA` recreates it with the
+    new column and its upserting trigger. Rows loaded before the upgrade keep a
+    NULL scrape date.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(salary_facts)")]
+    if columns and "scrape_date" not in columns:
+        conn.executescript("ALTER TABLE salary_facts ADD COLUMN scrape_date TEXT; DROP VIEW IF EXISTS salary;")
+
+
+def create_normalized_db(db_name: str = "salary_results.db"):
+    """
+    Create the normalized salary schema, migrating a flat `salary` table if there is one.
+
+    Job titles, locations and descriptions are stored once in lookup tables and
+    referenced by integer keys from `salary_facts`, which is indexed on title,
+    location and every percentile column. A row is unique per title, location
+    and scrape date. A `salary` view (with an INSTEAD OF INSERT trigger that
+    upserts on that key) keeps the flat layout readable and writable, so queries
+    and `insert_records()` calls written against the old table keep working, and
+    a `salary_latest` view shows only the latest scrape of every title and
+    location. The full-text index from `create_fts_index()` is created as well,
+    and the database is switched to WAL mode so API readers never wait on crawl
+    writes.
+
+    Parameters:
+    - db_name: Name of the database file (default: "salary_results.db").
+
+    Returns:
+    - tuple: (db_name, "salary", column names), like `create_db()`.
+    """
+    if not db_name.endswith(".db"):
+        db_name = db_name.replace(" ", "_") + ".db"
+
+    migrate_to_normalized(db_name)
+    try:
+        with sqlite3.connect(db_name) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            upgrade_normalized_schema(conn)
+            conn.executescript(NORMALIZED_SCHEMA)
+            if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM top_paying) AND EXISTS (SELECT 1 FROM salary_facts)"
+                            ).fetchone()[0]:
+                with conn:
+                    refresh_top_paying(conn.cursor())
+        create_fts_index(db_name)
+        return db_name, "salary", list(SALARY_COLUMNS)
+
+    except sqlite3.Error as err:
+        print(f"Error creating database or table: {err}")
+
+
+UPSERT_SALARY_FACT = f'''
+INSERT INTO salary_facts ({", ".join(SALARY_FACT_COLUMNS)})
+VALUES ({", ".join("?" for _ in SALARY_FACT_COLUMNS)})
+{UPSERT_SALARY_FACT_CONFLICT}
+'''
+
+BULK_INGEST_STAGING = '''
+CREATE TEMP TABLE IF NOT EXISTS ingest_batch (
+    title_id INTEGER, location_id INTEGER, description_id INTEGER,
+    nTile10 REAL, nTile25 REAL, nTile50 REAL, nTile75 REAL, nTile90 REAL, scrape_date TEXT
+);
+CREATE TEMP TABLE IF NOT EXISTS ingest_existing (id INTEGER PRIMARY KEY);
+'''
+
+# WHERE true keeps SQLite from parsing ON CONFLICT as a join constraint of the SELECT
+UPSERT_INGEST_BATCH = f'''
+INSERT INTO salary_facts ({", ".join(SALARY_FACT_COLUMNS)})
+SELECT {", ".join(SALARY_FACT_COLUMNS)}
+FROM temp.ingest_batch WHERE true ORDER BY rowid
+{UPSERT_SALARY_FACT_CONFLICT}
+'''
+
+BULK_INGEST_PRAGMAS = (
+    # WAL with synchronous=NORMAL only syncs at checkpoints and cannot corrupt the database on a crash
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+TOP_PAYING_DEPTH = 100
+
+# The latest scrape of every title and location, as in the `salary_latest` view
+TOP_PAYING_LATEST = f'''
+CREATE TEMP TABLE top_paying_latest AS
+SELECT id, location_id, nTile10, nTile25, nTile50, nTile75, nTile90, scrape_date
+FROM salary_facts f WHERE location_id IS NOT NULL {{where}} AND {LATEST_SALARY_FACT}
+'''
+
+# {column} is one of PERCENTILE_COLUMNS
+RANK_TOP_PAYING = '''
+INSERT INTO top_paying (location_id, percentile, rank, salary_id, value)
+SELECT location_id, ?, rank, id, value FROM (
+    SELECT id, location_id, {column} AS value,
+           ROW_NUMBER() OVER (PARTITION BY location_id ORDER BY {column} DESC, id) AS rank
+    FROM temp.top_paying_latest WHERE {column} IS NOT NULL
+)
+WHERE rank <= ?
+'''
+
+
+def location_ids(cursor: sqlite3.Cursor, names) -> list[int]:
+    """Return the `locations` ids of the given location names; unknown names are skipped."""
+    names = [name for name in set(names) if name is not None]
+    ids = []
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        ids.extend(location_id for location_id, in cursor.execute(
+            f"SELECT id FROM locations WHERE name IN ({', '.join('?' for _ in chunk)})", chunk))
+    return ids
+
+
+def has_top_paying_index(conn: sqlite3.Connection) -> bool:
+    """Return True if the database has the `top_paying` index (and the `locations` table it is keyed on)."""
+    row = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' "
+                       "AND name IN ('top_paying', 'locations')").fetchone()
+    return row[0] == 2
+
+
+def latest_salary_source(conn: sqlite3.Connection) -> str:
+    """
+    Return what to select from to get the latest row of every title and location.
+
+    That is the `salary_latest` view, or the query behind it on a normalized
+    database created before the view existed. A flat `salary` table keeps one
+    row per job and is returned as it is.
+    """
+    names = {name for name, in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('salary_latest', 'salary_facts')")}
+    if "salary_latest" in names:
+        return "salary_latest"
+    if "salary_facts" in names:
+        return f"({SALARY_LATEST_QUERY})"
+    return "salary"
+
+
+def refresh_top_paying(cursor: sqlite3.Cursor, location_ids=None, depth: int = TOP_PAYING_DEPTH):
+    """
+    Rebuild the `top_paying` index: the `depth` best paid jobs of every location, for every percentile.
+
+    Runs inside the caller's transaction, right after rows are ingested, so the
+    API's top paying endpoint reads ranked rows instead of sorting on every
+    request. Only the latest scrape of each title and location is ranked. Pass
+    the ids of the locations that received rows to rebuild only those; None
+    rebuilds every location.
+    """
+    if location_ids is None:
+        chunks = [None]
+    else:
+        location_ids = sorted({location_id for location_id in location_ids if location_id is not None})
+        chunks = [location_ids[start:start + 500] for start in range(0, len(location_ids), 500)]
+
+    for chunk in chunks:
+        params = chunk or []
+        location_filter = f"location_id IN ({', '.join('?' for _ in params)})"
+        cursor.execute("DROP TABLE IF EXISTS temp.top_paying_latest")
+        cursor.execute(TOP_PAYING_LATEST.format(where=f"AND {location_filter}" if chunk else ""), params)
+        cursor.execute("DELETE FROM top_paying" + (f" WHERE {location_filter}" if chunk else ""), params)
+        for column in PERCENTILE_COLUMNS:
+            cursor.execute(RANK_TOP_PAYING.format(column=column), (column, depth))
+        cursor.execute("DROP TABLE temp.top_paying_latest")
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def coerce_record(record) -> tuple:
+    """Coerce a scraped salary row: text to str or None, percentiles (numbers, numeric strings, 'N/A') to float or None."""
+    if isinstance(record, SalaryRecord):
+        return record.sqlite_params()
+    title, location, description, *percentiles = record
+    return (*(None if value is None else str(value) for value in (title, location, description)),
+            *(None if math.isnan(number) else number for number in map(to_number, percentiles)))
+
+
+def insert_normalized_record(cursor: sqlite3.Cursor, record, scrape_date: str = None) -> int:
+    """
+    Upsert one salary row into the normalized tables and return its `salary_facts` id.
+
+    Unlike inserting through the `salary` view, this reports the row id, which is
+    the existing row's when the title and location were already scraped that day.
+    """
+    title, location, description, *percentiles = coerce_record(record)
+    lookup_ids = []
+    for table, column, value in (("job_titles", "name", title), ("locations", "name", location),
+                                 ("descriptions", "text", description)):
+        if value is None:
+            lookup_ids.append(None)
+            continue
+        cursor.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+        lookup_ids.append(cursor.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()[0])
+
+    cursor.execute(UPSERT_SALARY_FACT + " RETURNING id", (*lookup_ids, *percentiles, scrape_date or today()))
+    return cursor.fetchone()[0]
+
+
+def resolve_lookup_ids(cursor: sqlite3.Cursor, table: str, column: str, values: set, ids: dict):
+    """Add the ids of `values` to `ids`, inserting the ones the lookup table does not have yet."""
+    missing = [value for value in values if value is not None and value not in ids]
+    if not missing:
+        return
+    cursor.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", [(value,) for value in missing])
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        ids.update(cursor.execute(f"SELECT {column}, id FROM {table} WHERE {column} IN ({placeholders})", chunk))
+
+
+def upsert_ingest_batch(cursor: sqlite3.Cursor, fts: bool):
+    """
+    Upsert the staged `ingest_batch` rows into `salary_facts`, keeping the full-text index in sync.
+
+    The per-row FTS triggers are dropped for the duration of the transaction and
+    the index is updated with three set-based statements instead: entries of the
+    rows about to be overwritten are deleted, and entries of every overwritten
+    or new row are inserted from the result. Nobody else ever sees the database
+    without its triggers, because they are recreated before the commit.
+    """
+    if not fts:
+        cursor.execute(UPSERT_INGEST_BATCH)
+        return
+
+    triggers = cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'salary_facts_fts_%'"
+    ).fetchall()
+    for name, _ in triggers:
+        cursor.execute(f'DROP TRIGGER "{name}"')
+
+    last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM salary_facts").fetchone()[0]
+    cursor.execute("DELETE FROM temp.ingest_existing")
+    cursor.execute(
+        "INSERT OR IGNORE INTO temp.ingest_existing SELECT f.id FROM temp.ingest_batch b JOIN salary_facts f "
+        "ON f.title_id = b.title_id AND f.location_id = b.location_id AND f.scrape_date = b.scrape_date"
+    )
+    cursor.execute(
+        "INSERT INTO salary_fts (salary_fts, rowid, job_title, job_location, job_description) "
+        "SELECT 'delete', id, job_title, job_location, job_description FROM salary "
+        "WHERE id IN (SELECT id FROM temp.ingest_existing)"
+    )
+    cursor.execute(UPSERT_INGEST_BATCH)
+    cursor.execute(
+        "INSERT INTO salary_fts (rowid, job_title, job_location, job_description) "
+        "SELECT id, job_title, job_location, job_description FROM salary "
+        "WHERE id IN (SELECT id FROM temp.ingest_existing) "
+        "UNION ALL SELECT id, job_title, job_location, job_description FROM salary WHERE id > ?",
+        (last_id,)
+    )
+
+    for _, sql in triggers:
+        cursor.execute(sql)
+
+
+def bulk_ingest(db_name: str, records, scrape_date: str = None, batch_size: int = 100_000) -> int | None:
+    """
+    Load salary rows into a normalized database, upserting on (title, location, scrape date).
+
+    Rows are coerced up front (see `coerce_record()`), so 'N/A' percentiles are
+    stored as NULL instead of text. Records are consumed as an iterator and
+    written `batch_size` at a time, one transaction per batch: the ids of all
+    new titles, locations and descriptions are resolved with a few set-based
+    statements, the facts are staged in a temporary table and upserted with a
+    single INSERT ... SELECT (see `upsert_ingest_batch()`). Loading the same rows
+    again for the same date updates them instead of adding duplicates.
+
+    Parameters:
+    - db_name: Database created by `create_normalized_db()`.
+    - records: Iterable of (job_title, job_location, job_description, nTile10, ..., nTile90) rows.
+    - scrape_date: ISO date the rows were scraped (default: today, UTC).
+    - batch_size: Rows per transaction (default: 100000).
+
+    Returns:
+    - int: The number of rows written, or None if an error occurred.
+    """
+    scrape_date = scrape_date or today()
+    lookups = (("job_titles", "name", {}), ("locations", "name", {}), ("descriptions", "text", {}))
+    touched_locations = set()
+    written = 0
+    try:
+        with closing(sqlite3.connect(db_name)) as conn:
+            for pragma in BULK_INGEST_PRAGMAS:
+                conn.execute(pragma)
+            conn.executescript(BULK_INGEST_STAGING)
+            fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'salary_fts'").fetchone() is not None
+
+            records = iter(records)
+            while batch := [coerce_record(record) for record in islice(records, batch_size)]:
+                with WRITE_SECONDS.time(writer="bulk_ingest"), conn:
+                    cursor = conn.cursor()
+                    for position, (table, column, ids) in enumerate(lookups):
+                        resolve_lookup_ids(cursor, table, column, {row[position] for row in batch}, ids)
+                    titles, locations, descriptions = (ids for _, _, ids in lookups)
+
+                    cursor.execute("DELETE FROM temp.ingest_batch")
+                    cursor.executemany("INSERT INTO temp.ingest_batch VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+                        (titles.get(title), locations.get(location), descriptions.get(description), *percentiles,
+                         scrape_date)
+                        for title, location, description, *percentiles in batch
+                    ])
+                    upsert_ingest_batch(cursor, fts)
+                    bump_data_version(cursor)
+                touched_locations.update(locations.get(row[1]) for row in batch)
+                WRITTEN_ROWS.inc(len(batch), writer="bulk_ingest")
+                written += len(batch)
+
+            if touched_locations:
+                with conn:
+                    refresh_top_paying(conn.cursor(), touched_locations)
+                    bump_data_version(conn.cursor())
+        return written
+
+    except sqlite3.Error as e:
+        print(f"An error occurred during bulk ingest after {written} rows: {e}")
+        return None
+
+
+def create_fts_index(db_name: str = "salary_results.db") -> bool:
+    """
+    Create the FTS5 full-text index over job title, location and description.
+
+    `salary_fts` is an external-content index over the `salary` view; triggers on
+    `salary_facts` keep it in sync with every insert, update and delete, however
+    the rows are written. A newly created index is filled from the existing rows.
+
+    Parameters:
+    - db_name: Name of a database using the normalized schema (default: "salary_results.db").
+
+    Returns:
+    - bool: True if the index exists, False if an error occurred.
+    """
+    try:
+        with sqlite3.connect(db_name) as conn:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'salary_fts'").fetchone()
+            conn.executescript(FTS_SCHEMA)
+            if not exists:
+                conn.execute("INSERT INTO salary_fts (salary_fts) VALUES ('rebuild')")
+        return True
+
+    except sqlite3.Error as err:
+        print(f"Error creating full-text index: {err}")
+        return False
@@ -0,0 +1,185 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from crawl_journal import DONE, FAILED, PENDING, utc_now
+
+LEASED = "leased"
+DEFAULT_LEASE_SECONDS = 120
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Crawl work queue shared by any number of worker processes through one SQLite database.
+
+    Every (job title, city) unit is a row. A worker leases a few pending units at
+    a time; a lease expires `lease_seconds` after it was taken or last extended
+    by `heartbeat()`, and an expired lease is handed to the next worker that asks,
+    so the units of a worker that died go back to the queue. A unit is attempted
+    at most `max_attempts` times.
+
+    The queue lives in the crawl database and has the same `conn` and `record()`
+    interface as `CrawlJournal`, so a `CheckpointWriter` commits each salary row
+    and its unit's completion in one transaction. Workers on other hosts need the
+    database on a filesystem with working POSIX locks; SQLite over NFS is not one.
+    """
+
+    def __init__(self, db_name: str = "salary_results.db", worker_id: str = None, table_name: str = "work_queue",
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = 3):
+        self.db_name = db_name
+        self.worker_id = worker_id or default_worker_id()
+        self.table_name = table_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = self.connect()
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}" (
+                                job_title TEXT NOT NULL,
+                                city TEXT NOT NULL,
+                                status TEXT NOT NULL,
+                                attempt INTEGER NOT NULL DEFAULT 0,
+                                worker TEXT,
+                                lease_expires REAL,
+                                salary_id INTEGER,
+                                error TEXT,
+                                updated_at TEXT NOT NULL,
+                                PRIMARY KEY (job_title, city)
+                                )''')
+        self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_status" ON "{table_name}" '
+                          f'(status, lease_expires)')
+        self.conn.commit()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_SECONDS)
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def fill(self, units: list[tuple], fresh: bool = False) -> int:
+        """
+        Add the units of a crawl to the queue; units already queued keep their state.
+
+        Args:
+            units (list): (job_title, city) pairs making up the whole crawl.
+            fresh (bool): Empty the queue first, starting a new sweep.
+
+        Returns:
+            int: The number of units added.
+        """
+        with self.conn:
+            if fresh:
+                self.conn.execute(f'DELETE FROM "{self.table_name}"')
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f'INSERT OR IGNORE INTO "{self.table_name}" (job_title, city, status, updated_at) VALUES (?, ?, ?, ?)',
+                [(job, city, PENDING, utc_now()) for job, city in units]
+            )
+            return self.conn.total_changes - before
+
+    def lease(self, count: int = 1) -> list[tuple]:
+        """
+        Take up to `count` units: pending ones, failed ones with attempts left, or ones whose lease expired.
+
+        The claim is a single UPDATE ... RETURNING under a write lock, so two
+        workers never lease the same unit. Expired leases that used up their
+        last attempt are marked failed first.
+
+        Returns:
+            list: The leased (job_title, city) pairs; empty when there is nothing left to do.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                f'UPDATE "{self.table_name}" SET status = ?, worker = NULL, error = ?, updated_at = ? '
+                f'WHERE status = ? AND lease_expires < ? AND attempt >= ?',
+                (FAILED, "lease expired", utc_now(), LEASED, now, self.max_attempts)
+            )
+            rows = self.conn.execute(
+                f'''UPDATE "{self.table_name}" SET status = ?, worker = ?, lease_expires = ?, attempt = attempt + 1,
+                           updated_at = ?
+                    WHERE rowid IN (SELECT rowid FROM "{self.table_name}"
+                                    WHERE (status IN (?, ?) OR (status = ? AND lease_expires < ?)) AND attempt < ?
+                                    ORDER BY status = ?, rowid LIMIT ?)
+                    RETURNING job_title, city''',
+                (LEASED, self.worker_id, now + self.lease_seconds, utc_now(), PENDING, FAILED, LEASED, now,
+                 self.max_attempts, FAILED, count)
+            ).fetchall()
+        return rows
+
+    def heartbeat(self, conn: sqlite3.Connection = None) -> int:
+        """Extend the leases this worker holds; returns how many it still holds."""
+        conn = conn or self.conn
+        with conn:
+            return conn.execute(
+                f'UPDATE "{self.table_name}" SET lease_expires = ? WHERE status = ? AND worker = ?',
+                (time.time() + self.lease_seconds, LEASED, self.worker_id)
+            ).rowcount
+
+    def record(self, cursor: sqlite3.Cursor, job_title: str, city: str, salary_id: int | None, error: str = None):
+        """Mark a leased unit done (with its salary row id) or failed, inside the caller's transaction."""
+        status = DONE if salary_id is not None else FAILED
+        cursor.execute(
+            f'UPDATE "{self.table_name}" SET status = ?, worker = NULL, lease_expires = NULL, salary_id = ?, '
+            f'error = ?, updated_at = ? WHERE job_title = ? AND city = ? AND worker = ?',
+            (status, salary_id, error, utc_now(), job_title, city, self.worker_id)
+        )
+
+    def release(self):
+        """Give this worker's unfinished leases back to the queue, without counting the attempt."""
+        with self.conn:
+            self.conn.execute(
+                f'UPDATE "{self.table_name}" SET status = ?, worker = NULL, lease_expires = NULL, '
+                f'attempt = attempt - 1, updated_at = ? WHERE status = ? AND worker = ?',
+                (PENDING, utc_now(), LEASED, self.worker_id)
+            )
+
+    def remaining(self) -> int:
+        """Units that are pending, leased, or failed with attempts left."""
+        return self.conn.execute(
+            f'SELECT COUNT(*) FROM "{self.table_name}" WHERE status != ? AND attempt < ? OR status = ?',
+            (DONE, self.max_attempts, LEASED)
+        ).fetchone()[0]
+
+    def summary(self) -> dict:
+        return dict(self.conn.execute(f'SELECT status, COUNT(*) FROM "{self.table_name}" GROUP BY status').fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+class Heartbeat:
+    """
+    Background thread extending a worker's leases every `interval` seconds while it works.
+
+    Uses its own connection, since SQLite connections are not shared between threads.
+    """
+
+    def __init__(self, queue: WorkQueue, interval: float = None):
+        self.queue = queue
+        self.interval = interval or queue.lease_seconds / 3
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        conn = self.queue.connect()
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.queue.heartbeat(conn)
+                except sqlite3.Error as e:
+                    print(f"Heartbeat failed: {e}")
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()